@@ -111,8 +111,8 @@ from audio.voice_analyzer import VoiceFeatures, get_voice_analyzer
 from models.schemas import RecordingInfo
 from ai.llama_processor import get_processor
 from ai.enhanced_processor import get_enhanced_processor
-from documents.processor import get_document_processor, DocumentInfo
-from documents.vector_store import get_vector_store
+from documents.processor import get_document_processor, shutdown_document_processor, DocumentInfo
+from documents.vector_store import get_vector_store, flush_vector_store
 from analysis.interview_analyzer import get_interview_analyzer
 from services.upload_queue_manager import (
     get_queue_manager, initialize_queue_manager,
@@ -397,6 +397,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Queue manager shutdown error: {e}")
     
+    # Write out any batched document registry changes
+    try:
+        await flush_vector_store()
+    except Exception as e:
+        logger.error(f"❌ Vector store flush error: {e}")
+    
+    # Stop PDF extraction worker processes
+    try:
+        await shutdown_document_processor()
+    except Exception as e:
+        logger.error(f"❌ Document processor shutdown error: {e}")
+    
     try:
         manager = get_device_manager_instance()
         await manager.disconnect_all()
@@ -1974,7 +1986,7 @@ async def upload_document(
                     "context": doc_info.context,
                     "category": doc_info.category,
                     "related_documents": doc_info.related_documents,
-                    "content_preview": doc_info.content[:200] + "..." if len(doc_info.content) > 200 else doc_info.content
+                    "content_preview": doc_info.content_preview
                 }
             }
         else:
@@ -5,19 +5,65 @@ Handles remote deployments via SSH with incremental updates, rollbacks, and moni
 """
 
 import asyncio
+import atexit
 import subprocess
 import json
 import os
 import hashlib
 import logging
+import re
+import shlex
+import shutil
+import tempfile
+from collections import deque
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, List, Any, Callable
+from typing import Optional, Deque, Dict, List, Any, Callable
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Optional: in-process SSH/SFTP client for bulk file uploads
+try:
+    import asyncssh
+    ASYNCSSH_AVAILABLE = True
+except ImportError:
+    ASYNCSSH_AVAILABLE = False
+
+# rsync --info=stats2 epilogue line carrying the exact transferred-file count
+_RSYNC_FILES_TRANSFERRED = re.compile(rb"Number of regular files transferred: ([\d,]+)")
+# Line separators in rsync output (progress2 redraws its line with '\r')
+_RSYNC_LINE_SPLIT = re.compile(rb"[\r\n]")
+# Prefix of the per-file lines rsync prints through --out-format
+_RSYNC_ITEM_PREFIX = b"::bhai-item:: "
+# Remote marker holding the tree hash of the last deployment
+_TREE_HASH_FILE = ".tree_hash"
+# Dependency manifests -> remote marker holding the hash of the last install
+_DEPENDENCY_MANIFESTS = {
+    "requirements.txt": ".requirements.sha256",
+    "frontend/package-lock.json": ".package-lock.sha256",
+}
+
+# Files the app writes in place on the remote. Backups copy these instead of
+# hardlinking them, so later writes don't leak into older snapshots.
+_BACKUP_MUTABLE_PATTERNS = (
+    "data/", "logs/", "uploads/", "documents/",
+    "*.db", "*.sqlite", "*.sqlite-*", "*.json", "*.log",
+)
+
+
+def _format_bytes(num_bytes: int) -> str:
+    """Human-readable size, like the -h output of free/df"""
+    size = float(num_bytes)
+    if size < 1024:
+        return f"{num_bytes}B"
+    for unit in ("K", "M", "G"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+    return f"{size / 1024:.1f}T"
+
 
 class DeploymentStatus(str, Enum):
     IDLE = "idle"
@@ -54,6 +100,14 @@ class DeploymentConfig:
     use_cloudflare_tunnel: bool = False
     cloudflare_hostname: Optional[str] = None  # e.g., "ssh.yourdomain.com"
     jump_host: Optional[str] = None  # For ProxyJump through a bastion
+    # Number of concurrent rsync processes for first-time syncs
+    rsync_parallelism: int = field(default_factory=lambda: min(4, os.cpu_count() or 1))
+    # Post-deploy health checks (ports on the remote host)
+    api_port: int = 8000
+    frontend_port: int = 3001
+    health_check_timeout: int = 30
+    # Share one SSH connection (ControlMaster) across all ssh/rsync calls
+    ssh_multiplexing: bool = True
     
     def get_effective_host(self) -> str:
         """Get the effective SSH host based on configuration"""
@@ -137,13 +191,20 @@ class OTADeploymentManager:
     """Manages Over-the-Air deployments to remote systems"""
     
     def __init__(self, config: Optional[DeploymentConfig] = None):
+        # Keyed by whether the command may share the multiplexed connection
+        self._ssh_options_cache: Dict[bool, List[str]] = {}
+        self._rsync_ssh_cmd_cache: Dict[bool, str] = {}
         self.config = config or DeploymentConfig()
         self.local_dir = Path(__file__).parent.parent.parent
         self.current_status = DeploymentStatus.IDLE
         self.current_progress = 0
         self.progress_message = ""
         self._progress_callbacks: List[Callable] = []
-        self._deployment_history: List[DeploymentResult] = []
+        self._exclude_file: Optional[Path] = None
+        self._exclude_file_patterns: tuple = ()
+        self._ssh_conn = None  # asyncssh connection, kept for one deployment
+        self._control_dir: Optional[str] = None  # ControlMaster socket directory
+        self._deployment_history: Deque[DeploymentResult] = deque(maxlen=20)
         
         # Files/directories to exclude from sync
         self.exclude_patterns = [
@@ -163,8 +224,23 @@ class OTADeploymentManager:
             '.DS_Store',
             'installer/',
             '*.dmg',
+            # Remote-only state (also protects it from --delete)
+            '.last_deployment',
+            _TREE_HASH_FILE,
+            *_DEPENDENCY_MANIFESTS.values(),
         ]
     
+    @property
+    def config(self) -> DeploymentConfig:
+        return self._config
+    
+    @config.setter
+    def config(self, config: DeploymentConfig):
+        # Reassigning the config invalidates the cached SSH command builders
+        self._config = config
+        self._ssh_options_cache = {}
+        self._rsync_ssh_cmd_cache = {}
+    
     def add_progress_callback(self, callback: Callable):
         """Add a callback for progress updates"""
         self._progress_callbacks.append(callback)
@@ -181,8 +257,16 @@ class OTADeploymentManager:
             except Exception as e:
                 logger.warning(f"Progress callback error: {e}")
     
-    def _get_ssh_options(self) -> List[str]:
-        """Get SSH command options based on configuration"""
+    def _get_ssh_options(self, multiplex: bool = True) -> List[str]:
+        """Get SSH command options based on configuration (cached per config)
+        
+        Pass multiplex=False for bulk data transfers: they get a connection
+        of their own instead of sharing the master's single ssh process.
+        """
+        cached = self._ssh_options_cache.get(multiplex)
+        if cached is not None:
+            return cached
+        
         opts = []
         
         # SSH key
@@ -200,6 +284,17 @@ class OTADeploymentManager:
             "-o", "StrictHostKeyChecking=accept-new",
         ])
         
+        # Connection multiplexing: the first ssh becomes the master and
+        # later control commands reuse its authenticated connection
+        if not multiplex:
+            opts.extend(["-o", "ControlMaster=no", "-o", "ControlPath=none"])
+        elif self.config.ssh_multiplexing:
+            opts.extend([
+                "-o", "ControlMaster=auto",
+                "-o", f"ControlPath={self._get_control_path()}",
+                "-o", "ControlPersist=60",
+            ])
+        
         # Jump host / bastion (for accessing behind firewalls)
         if self.config.jump_host:
             opts.extend(["-J", self.config.jump_host])
@@ -208,10 +303,16 @@ class OTADeploymentManager:
         if self.config.use_cloudflare_tunnel and self.config.cloudflare_hostname:
             opts.extend(["-o", f"ProxyCommand=cloudflared access ssh --hostname {self.config.cloudflare_hostname}"])
         
+        self._ssh_options_cache[multiplex] = opts
         return opts
     
-    async def _run_ssh_command(self, command: str, timeout: int = 60) -> tuple[bool, str, str]:
-        """Run a command on the remote system via SSH"""
+    async def _run_ssh_command(
+        self,
+        command: str,
+        timeout: int = 60,
+        input_data: Optional[bytes] = None
+    ) -> tuple[bool, str, str]:
+        """Run a command on the remote system via SSH, optionally feeding stdin"""
         ssh_cmd = ["ssh"]
         ssh_cmd.extend(self._get_ssh_options())
         
@@ -223,25 +324,46 @@ class OTADeploymentManager:
         try:
             process = await asyncio.create_subprocess_exec(
                 *ssh_cmd,
+                stdin=asyncio.subprocess.PIPE if input_data is not None else None,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=timeout
-            )
-            
-            success = process.returncode == 0
-            return success, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
-            
+        except Exception as e:
+            return False, "", str(e)
+        
+        try:
+            async with asyncio.timeout(timeout):
+                stdout, stderr = await process.communicate(input_data)
         except asyncio.TimeoutError:
+            # Reap the ssh child instead of leaving it running
+            process.kill()
+            await process.wait()
             return False, "", f"Command timed out after {timeout}s"
         except Exception as e:
             return False, "", str(e)
+        
+        success = process.returncode == 0
+        return success, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+    
+    async def _run_remote_script(self, script: str, timeout: int = 60) -> tuple[bool, str, str]:
+        """Run a multi-step shell script on the remote system.
+        
+        The script is fed to 'bash -se' over stdin under 'set -euo pipefail',
+        so the first failing step aborts the rest and the script size is not
+        bound by argv limits.
+        """
+        return await self._run_ssh_command(
+            "bash -se",
+            timeout=timeout,
+            input_data=f"set -euo pipefail\n{script}".encode('utf-8')
+        )
     
-    def _get_rsync_ssh_command(self) -> str:
-        """Get the SSH command string for rsync"""
+    def _get_rsync_ssh_command(self, multiplex: bool = True) -> str:
+        """Get the SSH command string for rsync (cached per config)"""
+        cached = self._rsync_ssh_cmd_cache.get(multiplex)
+        if cached is not None:
+            return cached
+        
         ssh_parts = ["ssh"]
         
         if self.config.ssh_key:
@@ -254,64 +376,568 @@ class OTADeploymentManager:
         ssh_parts.append("-o BatchMode=yes")
         ssh_parts.append("-o StrictHostKeyChecking=accept-new")
         
+        if not multiplex:
+            ssh_parts.append("-o ControlMaster=no")
+            ssh_parts.append("-o ControlPath=none")
+        elif self.config.ssh_multiplexing:
+            ssh_parts.append("-o ControlMaster=auto")
+            ssh_parts.append(f"-o ControlPath={self._get_control_path()}")
+            ssh_parts.append("-o ControlPersist=60")
+        
         if self.config.jump_host:
             ssh_parts.append(f"-J {self.config.jump_host}")
         
         if self.config.use_cloudflare_tunnel and self.config.cloudflare_hostname:
             ssh_parts.append(f"-o ProxyCommand='cloudflared access ssh --hostname {self.config.cloudflare_hostname}'")
         
-        return " ".join(ssh_parts)
+        cached = " ".join(ssh_parts)
+        self._rsync_ssh_cmd_cache[multiplex] = cached
+        return cached
+    
+    def _get_control_path(self) -> str:
+        """ControlMaster socket path, in a private directory created on first use"""
+        if self._control_dir is None:
+            # Under /tmp rather than $TMPDIR: socket paths are limited to ~104 bytes
+            self._control_dir = tempfile.mkdtemp(prefix="bhai-ssh-", dir="/tmp")
+            atexit.register(shutil.rmtree, self._control_dir, ignore_errors=True)
+        # %C is a hash of host, port and user, so each target gets its own master
+        return os.path.join(self._control_dir, "cm-%C")
+    
+    async def _close_control_master(self):
+        """Stop the shared SSH master connection, if one is running"""
+        if not self.config.ssh_multiplexing or self._control_dir is None:
+            return
+        ssh_cmd = ["ssh", *self._get_ssh_options(), "-O", "exit", self.config.get_effective_host()]
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *ssh_cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            async with asyncio.timeout(10):
+                await process.wait()
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        except Exception as e:
+            logger.debug(f"Could not stop SSH master connection: {e}")
+    
+    def _get_exclude_file(self) -> Path:
+        """Write exclude patterns to a file once and reuse it for every rsync"""
+        patterns = tuple(self.exclude_patterns)
+        if self._exclude_file is not None and patterns == self._exclude_file_patterns:
+            return self._exclude_file
+        
+        if self._exclude_file is None:
+            with tempfile.NamedTemporaryFile(
+                mode='w', prefix=f"bhai_excl_{os.getpid()}_", suffix=".txt", delete=False
+            ) as f:
+                self._exclude_file = Path(f.name)
+            atexit.register(self._exclude_file.unlink, missing_ok=True)
+        
+        self._exclude_file.write_text("\n".join(patterns) + "\n")
+        self._exclude_file_patterns = patterns
+        return self._exclude_file
+    
+    def _get_rsync_transport_args(
+        self,
+        entries: Optional[List[str]] = None,
+        multiplex: bool = True
+    ) -> List[str]:
+        """Get rsync exclude, SSH and source/destination arguments
+        
+        By default the whole local tree is synced; pass top-level entry names
+        to sync only those (kept at the same relative paths on the remote).
+        """
+        args = ["--exclude-from", str(self._get_exclude_file())]
+        
+        # Add SSH options (with custom port, jump host, cloudflare support)
+        args.extend(["-e", self._get_rsync_ssh_command(multiplex)])
+        
+        if entries is None:
+            sources = [f"{self.local_dir}/"]
+        else:
+            # '/./' marks where the path rsync recreates remotely starts
+            args.append("--relative")
+            sources = [f"{self.local_dir}/./{name}" for name in entries]
+        
+        # Get effective host and destination
+        effective_host = self.config.get_effective_host()
+        args.extend(sources)
+        args.append(f"{effective_host}:{self.config.remote_dir}/")
+        return args
+    
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        """SHA-256 of a local file, streamed through OpenSSL"""
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+    
+    async def _verify_remote_hashes(self, files: List[str]) -> List[str]:
+        """Verify synced files against local hashes in one SSH call.
+        
+        Returns the relative paths whose remote content does not match.
+        """
+        if not files:
+            return []
+        
+        # Hash concurrently; file_digest releases the GIL while hashing
+        hashes = await asyncio.gather(
+            *(asyncio.to_thread(self._hash_file, self.local_dir / name) for name in files)
+        )
+        manifest = "".join(f"{digest}  {name}\n" for digest, name in zip(hashes, files))
+        
+        success, stdout, _ = await self._run_ssh_command(
+            f"cd {shlex.quote(self.config.remote_dir)} && sha256sum -c --quiet - 2>/dev/null",
+            timeout=300,
+            input_data=manifest.encode('utf-8')
+        )
+        if success:
+            return []
+        
+        mismatched = []
+        for line in stdout.splitlines():
+            name, sep, _ = line.rpartition(': ')
+            if sep:
+                mismatched.append(name)
+        return mismatched
     
-    async def _run_rsync(self, dry_run: bool = False) -> tuple[bool, int, str]:
-        """Sync files to remote using rsync"""
+    async def _stream_rsync_output(
+        self,
+        stream: asyncio.StreamReader,
+        tail: deque,
+        changed: Optional[List[str]] = None
+    ) -> int:
+        """Consume rsync output incrementally, forwarding progress lines.
+
+        Only the last few raw lines are kept (for error reporting), so memory
+        stays constant regardless of how many files are transferred. Lines
+        are matched as bytes and only progress lines get decoded.
+        If changed is given, the relative paths of regular files rsync sent
+        are appended to it (from the itemized --out-format lines).
+        Returns the number of files transferred according to stats2.
+        """
+        files_synced = 0
+        pending = b""
+        
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                break
+            
+            lines = _RSYNC_LINE_SPLIT.split(pending + chunk)
+            pending = lines.pop()
+            
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                
+                if line.startswith(_RSYNC_ITEM_PREFIX):
+                    # '<f.st...... path': a regular file whose content was sent
+                    item, _, name = line[len(_RSYNC_ITEM_PREFIX):].partition(b' ')
+                    if changed is not None and item[:2] in (b'<f', b'>f'):
+                        changed.append(name.decode('utf-8', errors='surrogateescape'))
+                    continue
+                tail.append(line)
+                
+                if b'%' in line:
+                    # progress2 line: overall transfer progress
+                    self._update_progress(
+                        DeploymentStatus.SYNCING,
+                        self.current_progress,
+                        line.decode('utf-8', errors='replace')
+                    )
+                elif line.startswith(b"Number of regular files transferred"):
+                    match = _RSYNC_FILES_TRANSFERRED.match(line)
+                    if match:
+                        files_synced = int(match.group(1).replace(b',', b''))
+        
+        if pending.strip():
+            tail.append(pending.strip())
+        
+        return files_synced
+    
+    async def _run_rsync(
+        self,
+        dry_run: bool = False,
+        entries: Optional[List[str]] = None,
+        multiplex: bool = True,
+        changed: Optional[List[str]] = None
+    ) -> tuple[bool, int, str]:
+        """Sync files (or only the given top-level entries) to remote using rsync
+        
+        Pass a list as changed to collect the relative paths of the files
+        transferred, from the same run.
+        """
         rsync_cmd = [
-            "rsync", "-avz", "--progress",
+            "rsync", "-az",
             "--delete",  # Remove files that don't exist locally
         ]
+        if changed is None:
+            rsync_cmd.append("--info=stats2,progress2,name0")
+        else:
+            # Itemize each transferred path on its own tagged line
+            rsync_cmd.append("--info=stats2,progress2")
+            rsync_cmd.append(f"--out-format={_RSYNC_ITEM_PREFIX.decode()}%i %n")
         
         if dry_run:
             rsync_cmd.append("--dry-run")
         
-        # Add exclude patterns
-        for pattern in self.exclude_patterns:
-            rsync_cmd.extend(["--exclude", pattern])
-        
-        # Add SSH options (with custom port, jump host, cloudflare support)
-        ssh_cmd = self._get_rsync_ssh_command()
-        rsync_cmd.extend(["-e", ssh_cmd])
-        
-        # Get effective host and destination
-        effective_host = self.config.get_effective_host()
-        rsync_cmd.extend([
-            f"{self.local_dir}/",
-            f"{effective_host}:{self.config.remote_dir}/"
-        ])
+        rsync_cmd.extend(self._get_rsync_transport_args(entries, multiplex))
         
         try:
+            # Errors are interleaved into the same stream and end up in the tail
             process = await asyncio.create_subprocess_exec(
                 *rsync_cmd,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.STDOUT
             )
             
-            stdout, stderr = await asyncio.wait_for(
-                process.communicate(),
-                timeout=600  # 10 minute timeout for sync
-            )
-            
-            output = stdout.decode('utf-8', errors='replace')
+            # Consume output while rsync runs so the pipe can't fill up and block it
+            tail: deque = deque(maxlen=20)
+            try:
+                async with asyncio.timeout(600):  # 10 minute timeout for sync
+                    async with asyncio.TaskGroup() as tg:
+                        output_task = tg.create_task(self._stream_rsync_output(process.stdout, tail, changed))
+                        tg.create_task(process.wait())
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return False, 0, "rsync timed out after 600s"
             
-            # Count files synced (rough estimate from rsync output)
-            files_synced = output.count('\n')
+            files_synced = output_task.result()
             
             success = process.returncode == 0
-            return success, files_synced, output if success else stderr.decode('utf-8', errors='replace')
+            return success, files_synced, b"\n".join(tail).decode('utf-8', errors='replace')
             
-        except asyncio.TimeoutError:
-            return False, 0, "rsync timed out after 600s"
         except Exception as e:
             return False, 0, str(e)
     
+    async def _stream_tar(
+        self,
+        tar_args: List[str],
+        compress: bool = False,
+        file_list: Optional[List[str]] = None
+    ) -> tuple[bool, int, str]:
+        """Run 'tar -c | [zstd |] ssh tar -x' as a single stream into remote_dir.
+        
+        file_list, if given, is fed to tar over stdin (use with '--null -T -').
+        Returns (success, entries transferred, message).
+        """
+        remote_dir = shlex.quote(self.config.remote_dir)
+        extract_cmd = f"tar -xf - -C {remote_dir}"
+        if compress:
+            extract_cmd = f"zstd -d -T0 | {extract_cmd}"
+        
+        # Bulk data: a connection of its own, not the shared control master
+        ssh_cmd = ["ssh"]
+        ssh_cmd.extend(self._get_ssh_options(multiplex=False))
+        ssh_cmd.append(self.config.get_effective_host())
+        ssh_cmd.append(f"mkdir -p {remote_dir} && {extract_cmd}")
+        
+        stages = [["tar", "-cvf", "-", *tar_args]]
+        if compress:
+            stages.append(["zstd", "-T0", "-1", "-q", "-c"])
+        stages.append(ssh_cmd)
+        
+        pipes = [os.pipe() for _ in range(len(stages) - 1)]
+        processes = []
+        try:
+            for i, cmd in enumerate(stages):
+                is_first, is_last = i == 0, i == len(stages) - 1
+                if is_first:
+                    stdin = asyncio.subprocess.PIPE if file_list is not None else None
+                else:
+                    stdin = pipes[i - 1][0]
+                processes.append(await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=stdin,
+                    stdout=asyncio.subprocess.DEVNULL if is_last else pipes[i][1],
+                    stderr=asyncio.subprocess.PIPE if is_first or is_last else None
+                ))
+        except Exception as e:
+            for process in processes:
+                process.kill()
+            return False, 0, str(e)
+        finally:
+            # The children own the pipe ends now
+            for read_fd, write_fd in pipes:
+                os.close(read_fd)
+                os.close(write_fd)
+        
+        tar, ssh = processes[0], processes[-1]
+        
+        async def feed_file_list():
+            tar.stdin.write(b"\0".join(name.encode('utf-8') for name in file_list))
+            await tar.stdin.drain()
+            tar.stdin.close()
+        
+        async def count_members() -> int:
+            # tar -v lists one member per line on stderr (archive goes to stdout)
+            count = 0
+            while True:
+                chunk = await tar.stderr.read(65536)
+                if not chunk:
+                    return count
+                count += chunk.count(b'\n')
+        
+        try:
+            async with asyncio.timeout(600):
+                async with asyncio.TaskGroup() as tg:
+                    if file_list is not None:
+                        tg.create_task(feed_file_list())
+                    count_task = tg.create_task(count_members())
+                    ssh_stderr_task = tg.create_task(ssh.stderr.read())
+                    for process in processes:
+                        tg.create_task(process.wait())
+        except asyncio.TimeoutError:
+            for process in processes:
+                if process.returncode is None:
+                    process.kill()
+            await asyncio.gather(*(process.wait() for process in processes))
+            return False, 0, "tar stream timed out after 600s"
+        
+        files_synced = count_task.result()
+        ssh_stderr = ssh_stderr_task.result().decode('utf-8', errors='replace')
+        
+        if any(process.returncode != 0 for process in processes):
+            return False, 0, ssh_stderr or "tar stream failed"
+        
+        return True, files_synced, f"Streamed {files_synced} entries"
+    
+    async def _deploy_stream_tar(self) -> tuple[bool, int, str]:
+        """Ship the whole tree as one tar | zstd | ssh stream.
+
+        Used for first-time deploys, where rsync's per-file list exchange
+        dominates and there is nothing on the remote to diff against.
+        """
+        tar_args = []
+        for pattern in self.exclude_patterns:
+            # tar matches member names without a trailing slash
+            tar_args.extend(["--exclude", pattern.rstrip('/')])
+        tar_args.extend(["-C", str(self.local_dir), "."])
+        
+        return await self._stream_tar(tar_args, compress=True)
+    
+    async def _get_ssh_connection(self):
+        """Open (once per deployment) an asyncssh connection to the remote"""
+        if self._ssh_conn is None:
+            user, _, host = self.config.get_effective_host().rpartition('@')
+            options = {
+                "port": self.config.ssh_port,
+                "username": user or None,
+                "connect_timeout": self.config.ssh_timeout,
+            }
+            if self.config.ssh_key:
+                options["client_keys"] = [self.config.ssh_key]
+            if self.config.jump_host:
+                options["tunnel"] = self.config.jump_host
+            if self.config.use_cloudflare_tunnel and self.config.cloudflare_hostname:
+                options["proxy_command"] = f"cloudflared access ssh --hostname {self.config.cloudflare_hostname}"
+            self._ssh_conn = await asyncssh.connect(host, **options)
+        return self._ssh_conn
+    
+    async def _close_ssh_connection(self):
+        """Close the deployment's asyncssh connection, if one was opened"""
+        if self._ssh_conn is not None:
+            self._ssh_conn.close()
+            await self._ssh_conn.wait_closed()
+            self._ssh_conn = None
+    
+    @staticmethod
+    def _unique_parent_dirs(files: List[str]) -> List[str]:
+        """Deepest distinct parent directories of the given relative paths"""
+        directories = {os.path.dirname(name) for name in files} - {''}
+        # 'mkdir -p' creates ancestors, so only the leaves need listing
+        ancestors = set()
+        for directory in directories:
+            parent = os.path.dirname(directory)
+            while parent and parent not in ancestors:
+                ancestors.add(parent)
+                parent = os.path.dirname(parent)
+        return sorted(directories - ancestors)
+    
+    async def _sftp_upload(self, files: List[str], batch_size: int = 64) -> int:
+        """Upload files over one SFTP session with pipelined, concurrent puts"""
+        conn = await self._get_ssh_connection()
+        remote_root = self.config.remote_dir.rstrip('/')
+        
+        # Create every parent directory with one remote 'mkdir -p' instead
+        # of an SFTP round trip per path component
+        directories = self._unique_parent_dirs(files)
+        if directories:
+            quoted_root = shlex.quote(remote_root)
+            await conn.run(
+                f"mkdir -p {quoted_root} && cd {quoted_root} && xargs -0 mkdir -p --",
+                input="\0".join(directories),
+                check=True
+            )
+        
+        async with conn.start_sftp_client() as sftp:
+            for i in range(0, len(files), batch_size):
+                await asyncio.gather(*(
+                    sftp.put(
+                        str(self.local_dir / name),
+                        f"{remote_root}/{name}",
+                        block_size=240 * 1024,
+                        max_requests=128
+                    )
+                    for name in files[i:i + batch_size]
+                ))
+        
+        return len(files)
+    
+    async def _bulk_upload(self, files: List[str]) -> tuple[bool, int, str]:
+        """Upload specific files (paths relative to local_dir) in one session
+        
+        Uses SFTP over a shared asyncssh connection when available, otherwise
+        a single tar-over-SSH stream.
+        """
+        if not files:
+            return True, 0, "Nothing to upload"
+        
+        if ASYNCSSH_AVAILABLE:
+            try:
+                uploaded = await self._sftp_upload(files)
+                return True, uploaded, f"Uploaded {uploaded} files over SFTP"
+            except Exception as e:
+                logger.warning(f"SFTP upload failed, falling back to tar stream: {e}")
+                await self._close_ssh_connection()
+        
+        return await self._stream_tar(
+            ["-C", str(self.local_dir), "--null", "-T", "-"],
+            file_list=files
+        )
+    
+    async def _run_rsync_parallel(self) -> tuple[bool, int, str]:
+        """Sync the tree with several rsync processes, split by top-level entry.
+        
+        Each rsync runs its own SSH connection (multiplexing is turned off for
+        them), so encryption is spread over multiple cores instead of
+        saturating one.
+        """
+        entries = sorted(entry.name for entry in self.local_dir.iterdir())
+        parallelism = min(self.config.rsync_parallelism, len(entries))
+        if parallelism <= 1:
+            return await self._run_rsync()
+        
+        groups = [entries[i::parallelism] for i in range(parallelism)]
+        results = await asyncio.gather(*(
+            self._run_rsync(entries=group, multiplex=False) for group in groups
+        ))
+        
+        files_synced = sum(count for _, count, _ in results)
+        failures = [output for ok, _, output in results if not ok]
+        if failures:
+            return False, files_synced, "\n".join(failures)
+        
+        return True, files_synced, f"Synced {files_synced} files with {parallelism} parallel rsync processes"
+    
+    async def _sync_files(self) -> tuple[bool, int, str]:
+        """Sync the tree, using bulk transfer strategies on a first-time deploy"""
+        success, stdout, _ = await self._run_ssh_command(
+            f"test -e {shlex.quote(self.config.remote_dir)}/.last_deployment && echo deployed; "
+            f"command -v zstd >/dev/null && echo zstd; true"
+        )
+        
+        if success and 'deployed' not in stdout:
+            if shutil.which("zstd") and 'zstd' in stdout:
+                logger.info("First-time deployment, streaming tree with tar")
+                return await self._deploy_stream_tar()
+            
+            logger.info("First-time deployment, syncing with parallel rsync")
+            return await self._run_rsync_parallel()
+        
+        # Incremental update: per-process overhead would dominate, use one rsync
+        return await self._run_rsync()
+    
+    async def _get_changed_dependencies(self) -> Dict[str, str]:
+        """Compare local dependency manifest hashes with the last remote install.
+        
+        Returns {manifest: local_hash} for every manifest whose dependencies
+        need to be (re)installed. All remote markers are read in one SSH call.
+        """
+        local_hashes = {}
+        for manifest in _DEPENDENCY_MANIFESTS:
+            path = self.local_dir / manifest
+            if path.is_file():
+                local_hashes[manifest] = await asyncio.to_thread(self._hash_file, path)
+        
+        if not local_hashes:
+            return {}
+        
+        markers = " ".join(_DEPENDENCY_MANIFESTS[m] for m in local_hashes)
+        success, stdout, _ = await self._run_ssh_command(
+            f"cd {shlex.quote(self.config.remote_dir)} && "
+            # A marker without its install directory means the install is gone
+            f"{{ test -d venv || rm -f .requirements.sha256; }} && "
+            f"{{ test -d frontend/node_modules || rm -f .package-lock.sha256; }} && "
+            f"for f in {markers}; do echo \"$f $(cat $f 2>/dev/null)\"; done"
+        )
+        
+        remote_hashes = {}
+        if success:
+            for line in stdout.splitlines():
+                marker, _, digest = line.partition(' ')
+                remote_hashes[marker] = digest.strip()
+        
+        return {
+            manifest: digest
+            for manifest, digest in local_hashes.items()
+            if remote_hashes.get(_DEPENDENCY_MANIFESTS[manifest]) != digest
+        }
+    
+    async def _compute_tree_hash(self) -> Optional[str]:
+        """Hash of the local working tree (paths + git blob hashes).
+        
+        Covers tracked and untracked, non-ignored files as they are on disk.
+        Returns None when the local directory is not a git checkout.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "git", "ls-files", "-z", "--cached", "--others", "--exclude-standard",
+                cwd=self.local_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate()
+            if process.returncode != 0:
+                return None
+            
+            # Tracked files deleted from the working tree are still listed
+            paths = sorted({p for p in stdout.decode('utf-8', errors='replace').split('\0')
+                            if p and (self.local_dir / p).is_file()})
+            
+            process = await asyncio.create_subprocess_exec(
+                "git", "hash-object", "--stdin-paths",
+                cwd=self.local_dir,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate("\n".join(paths).encode('utf-8'))
+            if process.returncode != 0:
+                return None
+        except Exception as e:
+            logger.warning(f"Could not compute tree hash: {e}")
+            return None
+        
+        digest = hashlib.sha256()
+        for path, blob in zip(paths, stdout.decode().split()):
+            digest.update(f"{blob} {path}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
+    async def _mark_deployed(self, tree_hash: Optional[str]):
+        """Touch .last_deployment and record the deployed tree hash"""
+        remote_dir = shlex.quote(self.config.remote_dir)
+        command = f"touch {remote_dir}/.last_deployment"
+        if tree_hash:
+            command += f" && echo {tree_hash} > {remote_dir}/{_TREE_HASH_FILE}"
+        else:
+            command += f" && rm -f {remote_dir}/{_TREE_HASH_FILE}"
+        await self._run_ssh_command(command)
+    
     async def check_ssh_connection(self) -> bool:
         """Test SSH connection to remote host"""
         success, _, _ = await self._run_ssh_command("echo 'connected'", timeout=15)
@@ -343,20 +969,29 @@ class OTADeploymentManager:
         if success:
             info.gpu_info = stdout.strip()
         
-        # Get memory info
-        success, stdout, _ = await self._run_ssh_command("free -h | grep Mem | awk '{print $2, $7}'")
+        # Get memory info (read /proc/meminfo directly, values in KiB)
+        success, stdout, _ = await self._run_ssh_command(
+            "awk '/^MemTotal:|^MemAvailable:/{print $2}' /proc/meminfo"
+        )
         if success:
-            parts = stdout.strip().split()
-            if len(parts) >= 1:
-                info.memory_total = parts[0]
-            if len(parts) >= 2:
-                info.memory_available = parts[1]
+            parts = stdout.split()
+            if len(parts) >= 1 and parts[0].isdigit():
+                info.memory_total = _format_bytes(int(parts[0]) * 1024)
+            if len(parts) >= 2 and parts[1].isdigit():
+                info.memory_available = _format_bytes(int(parts[1]) * 1024)
         
-        # Get disk usage
+        # Get disk usage (block size, total, free and available blocks)
         success, stdout, _ = await self._run_ssh_command(
-            f"df -h {self.config.remote_dir} 2>/dev/null | tail -1 | awk '{{print $3\"/\"$2\" (\"$5\" used)\"}}'")
-        if success:
-            info.disk_usage = stdout.strip()
+            f"stat -f --format='%S %b %f %a' {shlex.quote(self.config.remote_dir)} 2>/dev/null"
+        )
+        parts = stdout.split()
+        if success and len(parts) == 4 and all(p.isdigit() for p in parts):
+            block_size, total, free, avail = (int(p) for p in parts)
+            used = (total - free) * block_size
+            # Same percentage df reports: used / (used + available to users)
+            usable = used + avail * block_size
+            percent = -(-used * 100 // usable) if usable else 0
+            info.disk_usage = f"{_format_bytes(used)}/{_format_bytes(total * block_size)} ({percent}% used)"
         
         # Get Python version
         success, stdout, _ = await self._run_ssh_command("python3 --version 2>/dev/null || echo 'Not installed'")
@@ -412,74 +1047,122 @@ class OTADeploymentManager:
         """Restart all Brutally Honest AI services on remote"""
         self._update_progress(DeploymentStatus.RESTARTING, 0, "Restarting services...")
         
-        commands = [
-            ("Stopping API", "sudo systemctl stop brutally-honest-api 2>/dev/null || true"),
-            ("Stopping frontend", "sudo systemctl stop brutally-honest-frontend 2>/dev/null || true"),
-            ("Starting API", "sudo systemctl start brutally-honest-api"),
-            ("Starting frontend", "sudo systemctl start brutally-honest-frontend"),
-        ]
-        
         errors = []
-        for i, (desc, cmd) in enumerate(commands):
-            self._update_progress(
-                DeploymentStatus.RESTARTING,
-                int((i + 1) / len(commands) * 100),
-                desc
-            )
-            
-            success, _, stderr = await self._run_ssh_command(cmd)
-            if not success:
-                errors.append(f"{desc} failed: {stderr}")
         
-        # Wait for services to start
-        await asyncio.sleep(3)
+        # systemctl blocks until the start jobs complete (readiness for
+        # Type=notify units), so no fixed sleep is needed before verifying
+        success, _, stderr = await self._run_ssh_command(
+            "sudo systemctl restart brutally-honest-api brutally-honest-frontend"
+        )
+        if not success:
+            errors.append(f"Restarting services failed: {stderr}")
+        
+        self._update_progress(DeploymentStatus.RESTARTING, 80, "Verifying services...")
         
         # Verify services are running
-        api_running = await self._check_service_running("brutally-honest-api")
-        frontend_running = await self._check_service_running("brutally-honest-frontend")
+        running = await self._check_services_running("brutally-honest-api", "brutally-honest-frontend")
         
-        if not api_running:
+        if not running["brutally-honest-api"]:
             errors.append("API service failed to start")
-        if not frontend_running:
+        if not running["brutally-honest-frontend"]:
             errors.append("Frontend service failed to start")
         
+        self._update_progress(DeploymentStatus.RESTARTING, 100, "Services restarted")
+        
         if errors:
             return False, "; ".join(errors)
         
         return True, "All services restarted successfully"
     
-    async def _check_service_running(self, service_name: str) -> bool:
-        """Check if a systemd service is running"""
-        success, stdout, _ = await self._run_ssh_command(
-            f"systemctl is-active {service_name} 2>/dev/null"
+    async def _check_services_running(self, *service_names: str) -> Dict[str, bool]:
+        """Check if systemd services are running, all in one SSH call"""
+        _, stdout, _ = await self._run_ssh_command(
+            f"systemctl is-active {' '.join(service_names)} 2>/dev/null"
         )
-        return success and 'active' in stdout
+        # One state per line, in the order the units were given
+        states = stdout.split()
+        return {
+            name: i < len(states) and states[i] == 'active'
+            for i, name in enumerate(service_names)
+        }
+    
+    async def _wait_for_http(self, url: str, timeout: int) -> bool:
+        """Poll a URL from the remote host until it answers or the timeout expires"""
+        # The polling loop runs remotely, so the whole wait is one SSH round trip
+        script = f"""
+        deadline=$((SECONDS + {timeout}))
+        until curl -fsS -o /dev/null --max-time 2 {shlex.quote(url)}; do
+            [ $SECONDS -ge $deadline ] && exit 1
+            sleep 0.5
+        done
+        """
+        success, _, _ = await self._run_remote_script(script, timeout=timeout + self.config.ssh_timeout)
+        return success
+    
+    async def _verify_remote_health(self) -> List[str]:
+        """Check that the API and frontend answer HTTP after a restart.
+        
+        Both endpoints are polled concurrently and each check returns as soon
+        as it gets a response. Returns a list of problems (empty when healthy).
+        """
+        timeout = self.config.health_check_timeout
+        checks = {
+            "API": f"http://127.0.0.1:{self.config.api_port}/health",
+            "Frontend": f"http://127.0.0.1:{self.config.frontend_port}/",
+        }
+        results = await asyncio.gather(
+            *(self._wait_for_http(url, timeout) for url in checks.values())
+        )
+        return [
+            f"{name} did not respond at {url} within {timeout}s"
+            for (name, url), healthy in zip(checks.items(), results)
+            if not healthy
+        ]
     
     async def create_backup(self) -> tuple[bool, str]:
-        """Create a backup of the remote installation"""
+        """Create a backup of the remote installation
+        
+        Unchanged files are hardlinked to the previous backup, so a backup
+        shares inodes with older ones and, after a rollback, with the live
+        tree. That is safe for files only ever replaced (rsync and pip write
+        a new file and rename it), and _BACKUP_MUTABLE_PATTERNS are always
+        copied. A file outside those patterns that is modified in place on
+        the remote (an append, an editor saving in place) changes every
+        snapshot sharing it.
+        """
         if not self.config.backup_enabled:
             return True, "Backups disabled"
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_dir = f"{self.config.remote_dir}_backup_{timestamp}"
-        
-        # Create backup
-        success, _, stderr = await self._run_ssh_command(
-            f"cp -r {self.config.remote_dir} {backup_dir}",
-            timeout=300
-        )
+        remote_dir = shlex.quote(self.config.remote_dir)
+        
+        # Create backup as a hardlink snapshot against the most recent backup,
+        # so only files changed since then take extra space and copy time.
+        # Mutable data is left out of that pass and copied in a second one.
+        excludes = " ".join(f"--exclude={shlex.quote(p)}" for p in _BACKUP_MUTABLE_PATTERNS)
+        backup_cmd = f"""
+        prev=$(ls -dt {remote_dir}_backup_* 2>/dev/null | head -1 || true)
+        if command -v rsync >/dev/null; then
+            rsync -a ${{prev:+--link-dest="$prev"}} {excludes} {remote_dir}/ {shlex.quote(backup_dir)}/
+            rsync -a {remote_dir}/ {shlex.quote(backup_dir)}/
+        else
+            cp -r {remote_dir} {shlex.quote(backup_dir)}
+        fi
+        """
+        success, _, stderr = await self._run_remote_script(backup_cmd, timeout=300)
         
         if not success:
             return False, f"Backup failed: {stderr}"
         
         # Clean old backups (keep only max_backups)
         cleanup_cmd = f"""
-        cd $(dirname {self.config.remote_dir}) && 
-        ls -dt brutally-honest-ai_backup_* 2>/dev/null | 
-        tail -n +{self.config.max_backups + 1} | 
-        xargs rm -rf 2>/dev/null || true
+        cd "$(dirname {remote_dir})"
+        ls -dt brutally-honest-ai_backup_* 2>/dev/null |
+            tail -n +{self.config.max_backups + 1} |
+            xargs rm -rf 2>/dev/null || true
         """
-        await self._run_ssh_command(cleanup_cmd)
+        await self._run_remote_script(cleanup_cmd)
         
         return True, backup_dir
     
@@ -541,24 +1224,22 @@ class OTADeploymentManager:
         
         self._update_progress(DeploymentStatus.ROLLING_BACK, 20, f"Rolling back to {backup['name']}...")
         
-        # Stop services first
-        await self._run_ssh_command("sudo systemctl stop brutally-honest-api brutally-honest-frontend 2>/dev/null || true")
-        
-        self._update_progress(DeploymentStatus.ROLLING_BACK, 40, "Restoring backup...")
-        
-        # Swap directories
+        # Stop services and swap directories in one SSH session
+        remote_dir = shlex.quote(self.config.remote_dir)
+        rollback_temp = shlex.quote(f"{self.config.remote_dir}_rollback_temp")
         rollback_cmd = f"""
-        mv {self.config.remote_dir} {self.config.remote_dir}_rollback_temp &&
-        mv {backup['path']} {self.config.remote_dir} &&
-        rm -rf {self.config.remote_dir}_rollback_temp
+        sudo systemctl stop brutally-honest-api brutally-honest-frontend 2>/dev/null || true
+        mv {remote_dir} {rollback_temp}
+        mv {shlex.quote(backup['path'])} {remote_dir}
+        rm -rf {rollback_temp}
         """
         
-        success, _, stderr = await self._run_ssh_command(rollback_cmd, timeout=300)
+        success, _, stderr = await self._run_remote_script(rollback_cmd, timeout=300)
         
         if not success:
             # Try to restore original
             await self._run_ssh_command(
-                f"mv {self.config.remote_dir}_rollback_temp {self.config.remote_dir} 2>/dev/null || true"
+                f"[ -e {remote_dir} ] || mv {rollback_temp} {remote_dir} 2>/dev/null || true"
             )
             return DeploymentResult(
                 success=False,
@@ -611,13 +1292,34 @@ class OTADeploymentManager:
                     completed_at=datetime.now()
                 )
             
-            # Create remote directory if needed
+            # Create remote directory if needed and read the last deployed tree hash
             self._update_progress(DeploymentStatus.PREPARING, 10, "Preparing remote directory...")
-            await self._run_ssh_command(f"mkdir -p {self.config.remote_dir}")
+            tree_hash = await self._compute_tree_hash()
+            remote_dir = shlex.quote(self.config.remote_dir)
+            _, remote_tree_hash, _ = await self._run_ssh_command(
+                f"mkdir -p {remote_dir} && cat {remote_dir}/{_TREE_HASH_FILE} 2>/dev/null || true"
+            )
             
-            # Sync files
+            if tree_hash and remote_tree_hash.strip() == tree_hash:
+                completed_at = datetime.now()
+                result = DeploymentResult(
+                    success=True,
+                    deployment_type=DeploymentType.QUICK,
+                    status=DeploymentStatus.COMPLETED,
+                    message="No changes since last deployment",
+                    started_at=started_at,
+                    completed_at=completed_at,
+                    duration_seconds=(completed_at - started_at).total_seconds(),
+                    files_synced=0
+                )
+                self._deployment_history.append(result)
+                self._update_progress(DeploymentStatus.COMPLETED, 100, result.message)
+                return result
+            
+            # Sync files, noting which ones were sent for verification
             self._update_progress(DeploymentStatus.SYNCING, 20, "Syncing files...")
-            sync_success, files_synced, sync_output = await self._run_rsync()
+            changed_files: List[str] = []
+            sync_success, files_synced, sync_output = await self._run_rsync(changed=changed_files)
             
             if not sync_success:
                 return DeploymentResult(
@@ -632,10 +1334,23 @@ class OTADeploymentManager:
             
             self._update_progress(DeploymentStatus.SYNCING, 60, f"Synced {files_synced} files")
             
-            # Mark deployment time
-            await self._run_ssh_command(
-                f"touch {self.config.remote_dir}/.last_deployment"
-            )
+            # Verify transferred content
+            self._update_progress(DeploymentStatus.VERIFYING, 65, "Verifying file hashes...")
+            mismatched = await self._verify_remote_hashes(changed_files)
+            upload_success = True
+            if mismatched:
+                # Re-send just the mismatched files in one stream, then re-check
+                upload_success, _, upload_output = await self._bulk_upload(mismatched)
+                if not upload_success:
+                    warnings.append(f"Re-upload of mismatched files failed: {upload_output}")
+                mismatched = await self._verify_remote_hashes(mismatched)
+            if mismatched:
+                warnings.append(f"Hash mismatch after sync: {', '.join(mismatched[:10])}")
+            
+            # Mark deployment time and the tree state it was deployed from.
+            # With bad files left behind the hash is cleared instead, so the
+            # next quick deploy syncs again rather than short-circuiting.
+            await self._mark_deployed(tree_hash if upload_success and not mismatched else None)
             
             # Restart services
             self._update_progress(DeploymentStatus.RESTARTING, 70, "Restarting services...")
@@ -646,15 +1361,13 @@ class OTADeploymentManager:
             
             # Verify
             self._update_progress(DeploymentStatus.VERIFYING, 90, "Verifying deployment...")
-            await asyncio.sleep(2)
             
             # Check if services are up
-            api_running = await self._check_service_running("brutally-honest-api")
-            frontend_running = await self._check_service_running("brutally-honest-frontend")
+            running = await self._check_services_running("brutally-honest-api", "brutally-honest-frontend")
             
-            if not api_running:
+            if not running["brutally-honest-api"]:
                 warnings.append("API service may not be running")
-            if not frontend_running:
+            if not running["brutally-honest-frontend"]:
                 warnings.append("Frontend service may not be running")
             
             completed_at = datetime.now()
@@ -689,6 +1402,9 @@ class OTADeploymentManager:
                 completed_at=datetime.now(),
                 errors=[str(e)]
             )
+        finally:
+            await self._close_ssh_connection()
+            await self._close_control_master()
     
     async def deploy_full(self) -> DeploymentResult:
         """Full deployment - reinstall everything"""
@@ -709,6 +1425,8 @@ class OTADeploymentManager:
                     completed_at=datetime.now()
                 )
             
+            tree_hash = await self._compute_tree_hash()
+            
             # Create backup
             self._update_progress(DeploymentStatus.PREPARING, 5, "Creating backup...")
             backup_success, backup_msg = await self.create_backup()
@@ -723,7 +1441,7 @@ class OTADeploymentManager:
             
             # Sync files
             self._update_progress(DeploymentStatus.SYNCING, 15, "Syncing all files...")
-            sync_success, files_synced, sync_output = await self._run_rsync()
+            sync_success, files_synced, sync_output = await self._sync_files()
             
             if not sync_success:
                 errors.append(f"File sync failed: {sync_output}")
@@ -739,32 +1457,48 @@ class OTADeploymentManager:
             
             self._update_progress(DeploymentStatus.SYNCING, 35, f"Synced {files_synced} files")
             
-            # Install Python dependencies
-            self._update_progress(DeploymentStatus.INSTALLING, 40, "Installing Python dependencies...")
-            install_cmd = f"""
-            cd {self.config.remote_dir} &&
-            if [ ! -d "venv" ]; then python3 -m venv venv; fi &&
-            source venv/bin/activate &&
-            pip install --upgrade pip wheel &&
-            pip install -r requirements.txt --no-cache-dir
-            """
-            
-            success, _, stderr = await self._run_ssh_command(install_cmd, timeout=600)
-            if not success:
-                warnings.append(f"Python install warning: {stderr}")
+            # Only reinstall dependencies whose manifests changed since the last install
+            changed_deps = await self._get_changed_dependencies()
             
-            self._update_progress(DeploymentStatus.INSTALLING, 60, "Installing Node.js dependencies...")
+            # Install Python dependencies
+            if "requirements.txt" in changed_deps:
+                self._update_progress(DeploymentStatus.INSTALLING, 40, "Installing Python dependencies...")
+                install_cmd = f"""
+                cd {shlex.quote(self.config.remote_dir)}
+                if [ ! -d venv ]; then python3 -m venv venv; fi
+                if command -v uv >/dev/null; then
+                    uv pip install -r requirements.txt --python venv/bin/python
+                else
+                    venv/bin/pip install --upgrade pip wheel
+                    venv/bin/pip install --prefer-binary -r requirements.txt
+                fi
+                echo {changed_deps["requirements.txt"]} > {_DEPENDENCY_MANIFESTS["requirements.txt"]}
+                """
+                
+                success, _, stderr = await self._run_remote_script(install_cmd, timeout=600)
+                if not success:
+                    warnings.append(f"Python install warning: {stderr}")
+            else:
+                self._update_progress(DeploymentStatus.INSTALLING, 40, "Python dependencies unchanged, skipping install")
             
             # Install Node.js dependencies
-            node_cmd = f"cd {self.config.remote_dir}/frontend && npm install"
-            success, _, stderr = await self._run_ssh_command(node_cmd, timeout=300)
-            if not success:
-                warnings.append(f"Node.js install warning: {stderr}")
+            if "frontend/package-lock.json" in changed_deps:
+                self._update_progress(DeploymentStatus.INSTALLING, 60, "Installing Node.js dependencies...")
+                node_cmd = f"""
+                cd {shlex.quote(self.config.remote_dir)}/frontend
+                # The frontend is a server-rendered Express app with no build step;
+                # skip dev tooling (jest, playwright, nodemon) on the device
+                npm ci --omit=dev --no-audit --no-fund
+                echo {changed_deps["frontend/package-lock.json"]} > ../{_DEPENDENCY_MANIFESTS["frontend/package-lock.json"]}
+                """
+                success, _, stderr = await self._run_remote_script(node_cmd, timeout=300)
+                if not success:
+                    warnings.append(f"Node.js install warning: {stderr}")
+            else:
+                self._update_progress(DeploymentStatus.INSTALLING, 60, "Node.js dependencies unchanged, skipping install")
             
-            # Mark deployment time
-            await self._run_ssh_command(
-                f"touch {self.config.remote_dir}/.last_deployment"
-            )
+            # Mark deployment time and the tree state it was deployed from
+            await self._mark_deployed(tree_hash)
             
             # Restart services
             self._update_progress(DeploymentStatus.RESTARTING, 80, "Restarting services...")
@@ -775,7 +1509,8 @@ class OTADeploymentManager:
             
             # Verify
             self._update_progress(DeploymentStatus.VERIFYING, 95, "Verifying deployment...")
-            await asyncio.sleep(3)
+            for problem in await self._verify_remote_health():
+                warnings.append(f"Health check: {problem}")
             
             completed_at = datetime.now()
             duration = (completed_at - started_at).total_seconds()
@@ -809,10 +1544,12 @@ class OTADeploymentManager:
                 completed_at=datetime.now(),
                 errors=[str(e)]
             )
+        finally:
+            await self._close_control_master()
     
     def get_deployment_history(self) -> List[Dict[str, Any]]:
         """Get deployment history"""
-        return [r.to_dict() for r in self._deployment_history[-20:]]  # Last 20
+        return [r.to_dict() for r in self._deployment_history]  # Last 20 (bounded deque)
     
     def get_current_status(self) -> Dict[str, Any]:
         """Get current deployment status"""
@@ -4,17 +4,60 @@ Handles text extraction from various document formats (txt, pdf, doc, docx)
 """
 
 import asyncio
+import io
 import logging
+import multiprocessing
 import tempfile
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, List, Tuple, Callable
 from dataclasses import dataclass
 import hashlib
 from datetime import datetime
+from collections import OrderedDict
+from functools import partial
+
+from .utils import run_in_thread
+
+try:
+    from charset_normalizer import from_bytes as charset_from_bytes
+    CHARSET_NORMALIZER_AVAILABLE = True
+except ImportError:
+    CHARSET_NORMALIZER_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# PDFium is not thread-safe (not even across separate documents), so calls
+# from the extraction threads are serialized and large PDFs are split across
+# worker processes instead
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _pdfium_page_text(pdf, index: int) -> str:
+    """Extract the text of one page of an open PDFium document"""
+    page = pdf[index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace('\r\n', '\n')
+        finally:
+            textpage.close()
+    finally:
+        page.close()
+
+
+def _pdfium_page_range_text(file_data: bytes, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) with PDFium (runs in a worker process)"""
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(file_data)
+    try:
+        return [_pdfium_page_text(pdf, i) for i in range(start, stop)]
+    finally:
+        pdf.close()
+
 @dataclass
 class DocumentInfo:
     """Information about a processed document"""
@@ -38,43 +81,94 @@ class DocumentInfo:
             self.tags = []
         if self.related_documents is None:
             self.related_documents = []
+    
+    @property
+    def content_preview(self) -> str:
+        """First 200 characters of the content, computed on demand"""
+        return self.content[:200] + '...' if len(self.content) > 200 else self.content
 
 class DocumentProcessor:
     """Document processor for extracting text from various formats"""
     
+    CONTENT_CACHE_SIZE = 256
+    # PDFs with at least this many pages are extracted across processes
+    PDF_PARALLEL_MIN_PAGES = 16
+    # Worker process cap; each holds a copy of the PDF being extracted
+    PDF_MAX_WORKERS = 4
+    
     def __init__(self):
-        self.supported_formats = {'.txt', '.pdf', '.doc', '.docx'}
         self.is_initialized = False
+        self._extract_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Worker processes for large PDFs, started on first use
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_pool_lock = threading.Lock()
+        requested = os.environ.get("BH_PDF_WORKERS", "").strip()
+        self._pdf_workers = int(requested) if requested.isdigit() else min(self.PDF_MAX_WORKERS, os.cpu_count() or 1)
+        
+        # (file hash, extension) -> extracted text, least recently used first
+        self._content_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        
+        # Extraction entry points, resolved once by the support checks
+        self._pdfium_document = None
+        self._pdfplumber_open = None
+        self._PyPDF2_reader = None
+        self._docx2txt_process = None
+        self._docx_Document = None
         
         # Check available libraries
         self.pdf_available = self._check_pdf_support()
         self.doc_available = self._check_doc_support()
         
+        # Extension -> extractor dispatch table
+        self._extractors: Dict[str, Callable[[bytes], str]] = {
+            '.txt': self._extract_text_from_txt,
+            '.pdf': self._extract_text_from_pdf,
+            '.doc': partial(self._extract_text_from_doc, file_ext='.doc'),
+            '.docx': partial(self._extract_text_from_doc, file_ext='.docx'),
+        }
+        self.supported_formats = set(self._extractors)
+        
     def _check_pdf_support(self) -> bool:
-        """Check if PDF processing is available"""
+        """Check if PDF processing is available and bind the extractors"""
+        try:
+            import pypdfium2
+            self._pdfium_document = pypdfium2.PdfDocument
+        except ImportError:
+            pass
+        try:
+            import pdfplumber
+            self._pdfplumber_open = pdfplumber.open
+        except ImportError:
+            pass
         try:
             import PyPDF2
-            return True
+            self._PyPDF2_reader = PyPDF2.PdfReader
         except ImportError:
-            try:
-                import pdfplumber
-                return True
-            except ImportError:
-                logger.warning("PDF support not available - install PyPDF2 or pdfplumber")
-                return False
+            pass
+        
+        if self._pdfium_document or self._pdfplumber_open or self._PyPDF2_reader:
+            return True
+        logger.warning("PDF support not available - install pypdfium2, pdfplumber or PyPDF2")
+        return False
     
     def _check_doc_support(self) -> bool:
-        """Check if DOC/DOCX processing is available"""
+        """Check if DOC/DOCX processing is available and bind the extractors"""
         try:
-            import python_docx2txt
-            return True
+            import docx2txt
+            self._docx2txt_process = docx2txt.process
         except ImportError:
-            try:
-                from docx import Document
-                return True
-            except ImportError:
-                logger.warning("DOC/DOCX support not available - install python-docx2txt or python-docx")
-                return False
+            pass
+        try:
+            from docx import Document
+            self._docx_Document = Document
+        except ImportError:
+            pass
+        
+        if self._docx2txt_process or self._docx_Document:
+            return True
+        logger.warning("DOC/DOCX support not available - install python-docx2txt or python-docx")
+        return False
     
     async def initialize(self) -> bool:
         """Initialize the document processor"""
@@ -90,6 +184,10 @@ class DocumentProcessor:
             
             logger.info(f"📄 Supported formats: {', '.join(available_formats)}")
             
+            # Bound concurrent extractions to the available cores
+            if self._extract_semaphore is None:
+                self._extract_semaphore = asyncio.Semaphore(max(2, os.cpu_count() or 1))
+            
             self.is_initialized = True
             return True
             
@@ -98,150 +196,223 @@ class DocumentProcessor:
             return False
     
     def _get_file_hash(self, content: bytes) -> str:
-        """Generate SHA-256 hash of file content"""
-        return hashlib.sha256(content).hexdigest()
+        """Generate SHA-256 hash of file content
+        
+        Hashes a zero-copy memoryview of the upload in one OpenSSL call
+        (SHA-NI accelerated where available, GIL released while hashing).
+        """
+        return hashlib.sha256(memoryview(content)).hexdigest()
     
-    def _extract_text_from_txt(self, file_path: str) -> str:
+    def _extract_text_from_txt(self, file_data: bytes) -> str:
         """Extract text from TXT file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            # Fast path: nearly all uploads are UTF-8
+            text = file_data.decode('utf-8')
         except UnicodeDecodeError:
-            # Try with different encodings
-            for encoding in ['latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        return f.read()
-                except UnicodeDecodeError:
-                    continue
-            raise ValueError("Could not decode text file with any supported encoding")
+            text = None
+            
+            # Detect the encoding once instead of retrying decodes
+            if CHARSET_NORMALIZER_AVAILABLE:
+                best = charset_from_bytes(file_data).best()
+                if best is not None:
+                    text = str(best)
+            
+            if text is None:
+                # latin-1 maps every byte, so this always succeeds
+                text = file_data.decode('latin-1')
+        
+        # Match the newline translation of reading the file in text mode
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
     
-    def _extract_text_from_pdf(self, file_path: str) -> str:
+    def _extract_text_from_pdf(self, file_data: bytes) -> str:
         """Extract text from PDF file"""
         if not self.pdf_available:
             raise ValueError("PDF processing not available")
         
         text = ""
         
-        # Try pdfplumber first (better text extraction)
-        try:
-            import pdfplumber
-            with pdfplumber.open(file_path) as pdf:
+        # Try PDFium first (native, much faster than the pure Python parsers)
+        if self._pdfium_document:
+            for page_text in self._extract_pdf_pages_pdfium(file_data):
+                if page_text:
+                    text += page_text + "\n"
+            if text.strip():
+                return text.strip()
+        
+        # Then pdfplumber (better text extraction than PyPDF2)
+        if self._pdfplumber_open:
+            with self._pdfplumber_open(io.BytesIO(file_data)) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
                     if page_text:
                         text += page_text + "\n"
             if text.strip():
                 return text.strip()
-        except ImportError:
-            pass
         
         # Fallback to PyPDF2
-        try:
-            import PyPDF2
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+        if self._PyPDF2_reader:
+            reader = self._PyPDF2_reader(io.BytesIO(file_data))
+            for page in reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
             return text.strip()
-        except ImportError:
-            raise ValueError("No PDF processing library available")
+        
+        raise ValueError("No PDF processing library available")
     
-    def _extract_text_from_doc(self, file_path: str) -> str:
+    def _extract_pdf_pages_pdfium(self, file_data: bytes) -> List[str]:
+        """Extract per-page text with PDFium, in parallel for large documents"""
+        with _PDFIUM_LOCK:
+            pdf = self._pdfium_document(file_data)
+            try:
+                page_count = len(pdf)
+                if page_count < self.PDF_PARALLEL_MIN_PAGES or self._pdf_workers < 2:
+                    return [_pdfium_page_text(pdf, i) for i in range(page_count)]
+            finally:
+                pdf.close()
+        
+        # Split the pages into one contiguous range per worker process, giving
+        # each at least half the threshold so it pays for its copy of the file
+        workers = min(self._pdf_workers, page_count * 2 // self.PDF_PARALLEL_MIN_PAGES)
+        step = -(-page_count // workers)
+        try:
+            pool = self._get_pdf_pool()
+            futures = [
+                pool.submit(_pdfium_page_range_text, file_data, start, min(start + step, page_count))
+                for start in range(0, page_count, step)
+            ]
+            return [page_text for future in futures for page_text in future.result()]
+        except BrokenProcessPool:
+            logger.warning("PDF worker pool died, extracting in-process instead")
+            with self._pdf_pool_lock:
+                self._pdf_pool = None
+            with _PDFIUM_LOCK:
+                return _pdfium_page_range_text(file_data, 0, page_count)
+    
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        """Get the PDF worker pool, starting it on first use
+        
+        Workers are never forked from the server process: it is
+        multi-threaded, and a fork would inherit locks held by other threads
+        along with the loaded model state.
+        """
+        with self._pdf_pool_lock:
+            if self._pdf_pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pdf_pool = ProcessPoolExecutor(
+                    max_workers=self._pdf_workers,
+                    mp_context=multiprocessing.get_context(method)
+                )
+            return self._pdf_pool
+    
+    def shutdown(self):
+        """Stop the PDF worker processes, if started"""
+        with self._pdf_pool_lock:
+            pool, self._pdf_pool = self._pdf_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+    
+    def _extract_text_from_doc(self, file_data: bytes, file_ext: str) -> str:
         """Extract text from DOC/DOCX file"""
         if not self.doc_available:
             raise ValueError("DOC/DOCX processing not available")
         
-        file_ext = Path(file_path).suffix.lower()
+        # DOCX is a zip archive and is read straight from memory; legacy
+        # DOC still goes through a temporary file
+        if file_ext == '.docx':
+            return self._extract_text_from_doc_source(lambda: io.BytesIO(file_data), file_ext)
+        
+        with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as temp_file:
+            temp_file.write(file_data)
+            temp_path = temp_file.name
         
-        # Try python-docx2txt first (simpler)
         try:
-            import docx2txt
-            text = docx2txt.process(file_path)
+            return self._extract_text_from_doc_source(lambda: temp_path, file_ext)
+        finally:
+            # Clean up temporary file
+            Path(temp_path).unlink(missing_ok=True)
+    
+    def _extract_text_from_doc_source(self, open_source: Callable[[], Any], file_ext: str) -> str:
+        """Run the DOC/DOCX extractors against a path or fresh file object"""
+        # Try python-docx2txt first (simpler)
+        if self._docx2txt_process:
+            text = self._docx2txt_process(open_source())
             if text and text.strip():
                 return text.strip()
-        except ImportError:
-            pass
         
         # Fallback to python-docx (for DOCX only)
-        if file_ext == '.docx':
-            try:
-                from docx import Document
-                doc = Document(file_path)
-                text = ""
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
-                return text.strip()
-            except ImportError:
-                pass
+        if file_ext == '.docx' and self._docx_Document:
+            doc = self._docx_Document(open_source())
+            text = ""
+            for paragraph in doc.paragraphs:
+                text += paragraph.text + "\n"
+            return text.strip()
         
         raise ValueError(f"Could not extract text from {file_ext} file")
     
+    @staticmethod
+    def _get_file_extension(filename: str) -> str:
+        """Lower-cased extension of a filename"""
+        return Path(filename).suffix.lower()
+    
     async def process_document(self, file_data: bytes, filename: str) -> DocumentInfo:
         """Process a document and extract text"""
         if not self.is_initialized:
             await self.initialize()
         
         try:
-            # Get file extension
-            file_ext = Path(filename).suffix.lower()
-            if file_ext not in self.supported_formats:
+            # Get file extension and its extractor in one lookup
+            file_ext = self._get_file_extension(filename)
+            extractor = self._extractors.get(file_ext)
+            if extractor is None:
                 raise ValueError(f"Unsupported file format: {file_ext}")
             
             # Generate file hash and ID
-            file_hash = self._get_file_hash(file_data)
+            file_hash = await run_in_thread(self._get_file_hash, file_data)
             doc_id = f"doc_{file_hash[:16]}"
             
-            # Save to temporary file for processing
-            with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as temp_file:
-                temp_file.write(file_data)
-                temp_path = temp_file.name
-            
-            try:
-                # Extract text based on file type
-                if file_ext == '.txt':
-                    content = self._extract_text_from_txt(temp_path)
-                elif file_ext == '.pdf':
-                    content = self._extract_text_from_pdf(temp_path)
-                elif file_ext in ['.doc', '.docx']:
-                    content = self._extract_text_from_doc(temp_path)
-                else:
-                    raise ValueError(f"Unsupported file type: {file_ext}")
+            # Identical re-uploads reuse the previously extracted text
+            cache_key = (file_hash, file_ext)
+            content = self._content_cache.get(cache_key)
+            if content is not None:
+                self._content_cache.move_to_end(cache_key)
+                logger.debug(f"Content cache hit for {filename} ({doc_id})")
+            else:
+                # Extract off the event loop, bounded so a burst of uploads
+                # cannot oversubscribe the CPU
+                async with self._extract_semaphore:
+                    content = await run_in_thread(extractor, file_data)
                 
                 # Clean and validate content
                 content = content.strip()
                 if not content:
                     raise ValueError("No text content found in document")
                 
-                # Create document info
-                doc_info = DocumentInfo(
-                    id=doc_id,
-                    filename=filename,
-                    file_type=file_ext,
-                    content=content,
-                    metadata={
-                        'original_filename': filename,
-                        'file_extension': file_ext,
-                        'processing_method': 'text_extraction',
-                        'content_preview': content[:200] + '...' if len(content) > 200 else content
-                    },
-                    upload_time=datetime.now(),
-                    file_size=len(file_data),
-                    text_length=len(content),
-                    hash=file_hash
-                )
-                
-                logger.info(f"✅ Processed document: {filename} ({len(content)} chars)")
-                return doc_info
-                
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+                self._content_cache[cache_key] = content
+                if len(self._content_cache) > self.CONTENT_CACHE_SIZE:
+                    self._content_cache.popitem(last=False)
+            
+            # Create document info
+            doc_info = DocumentInfo(
+                id=doc_id,
+                filename=filename,
+                file_type=file_ext,
+                content=content,
+                metadata={
+                    'original_filename': filename,
+                    'file_extension': file_ext,
+                    'processing_method': 'text_extraction'
+                },
+                upload_time=datetime.now(),
+                file_size=len(file_data),
+                text_length=len(content),
+                hash=file_hash
+            )
+            
+            logger.info(f"✅ Processed document: {filename} ({len(content)} chars)")
+            return doc_info
                     
         except Exception as e:
             logger.error(f"Failed to process document {filename}: {e}")
@@ -250,6 +421,12 @@ class DocumentProcessor:
 # Global processor instance
 _processor = None
 
+async def shutdown_document_processor():
+    """Stop the global processor's worker processes, if one exists"""
+    if _processor is not None:
+        # Joins the workers, so keep it off the event loop
+        await run_in_thread(_processor.shutdown)
+
 async def get_document_processor() -> DocumentProcessor:
     """Get or create the global document processor"""
     global _processor
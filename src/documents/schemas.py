@@ -3,11 +3,59 @@ Enhanced Data Schemas for Knowledge Base & Validation System
 Includes support for profiles, tags, validation, and fact-checking
 """
 
+import json
+import os
+import sys
+import threading
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from enum import Enum
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Random IDs are sliced from one pooled os.urandom() call instead of one
+# uuid4() (and getrandom syscall) per fact/claim
+_ID_POOL_SIZE = 1024
+_id_pool = ""
+_id_offset = 0
+_id_lock = threading.Lock()
+
+
+def _fast_id() -> str:
+    """Random 128-bit ID as 32 hex characters (same shape as uuid4().hex)"""
+    global _id_pool, _id_offset
+    with _id_lock:
+        if _id_offset >= len(_id_pool):
+            _id_pool = os.urandom(16 * _ID_POOL_SIZE).hex()
+            _id_offset = 0
+        pool, start = _id_pool, _id_offset
+        _id_offset += 32
+    return pool[start:start + 32]
+
+
+def _reset_id_pool():
+    """Drop the inherited pool in a forked child, which would repeat the parent's IDs"""
+    global _id_pool, _id_offset, _id_lock
+    _id_pool = ""
+    _id_offset = 0
+    # Another thread may have held the lock at fork time
+    _id_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern categorical strings so repeated values share one object"""
+    return sys.intern(value) if type(value) is str else value
+
 
 # ============================================================================
 # ENUMS
@@ -116,6 +164,9 @@ class Fact:
     tags: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    def __post_init__(self):
+        self.source_type = _intern(self.source_type)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -146,6 +197,9 @@ class ClientProfile:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
+    def __post_init__(self):
+        self.type = _intern(self.type)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -243,6 +297,19 @@ class Entity:
     start_pos: int
     end_pos: int
     metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def __post_init__(self):
+        self.type = _intern(self.type)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'text': self.text,
+            'type': self.type,
+            'confidence': self.confidence,
+            'start_pos': self.start_pos,
+            'end_pos': self.end_pos,
+            'metadata': self.metadata
+        }
 
 
 @dataclass
@@ -258,12 +325,15 @@ class Claim:
     speaker: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    def __post_init__(self):
+        self.speaker = _intern(self.speaker)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
             'text': self.text,
             'type': self.type.value,
-            'entities': [e.__dict__ for e in self.entities],
+            'entities': [e.to_dict() for e in self.entities],
             'transcription_id': self.transcription_id,
             'timestamp': self.timestamp,
             'confidence': self.confidence,
@@ -283,6 +353,9 @@ class Evidence:
     supports_claim: bool = True
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    def __post_init__(self):
+        self.source_type = _intern(self.source_type)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'source_type': self.source_type,
@@ -401,6 +474,9 @@ class UseCase:
     updated_at: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    def __post_init__(self):
+        self.type = _intern(self.type)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
@@ -423,19 +499,44 @@ class UseCase:
 # HELPER FUNCTIONS
 # ============================================================================
 
+def _json_default(obj: Any) -> Any:
+    """Fallback encoder for objects the JSON encoder does not handle natively"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_json(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serialize a schema object (or containers of them) to UTF-8 JSON bytes.
+    
+    With orjson the dataclasses, enums and datetimes are encoded directly in C,
+    producing the same document as json.dumps(obj.to_dict()) without building
+    the intermediate dicts.
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=_json_default, option=option)
+    return json.dumps(
+        obj, default=_json_default, indent=2 if indent else None, ensure_ascii=False
+    ).encode('utf-8')
+
+
 def create_fact(statement: str, source_id: str, source_type: str = "manual", 
                 confidence: float = 1.0, verified: bool = False) -> Fact:
     """Helper function to create a new fact"""
-    import uuid
+    now = datetime.now()
     return Fact(
-        id=str(uuid.uuid4()),
+        id=_fast_id(),
         statement=statement,
         confidence=confidence,
         source_type=source_type,
         source_id=source_id,
         verified=verified,
-        created_at=datetime.now(),
-        updated_at=datetime.now()
+        created_at=now,
+        updated_at=now
     )
 
 
@@ -443,9 +544,8 @@ def create_claim(text: str, transcription_id: str, timestamp: float = 0.0,
                  claim_type: ClaimType = ClaimType.STATEMENT, 
                  confidence: float = 1.0) -> Claim:
     """Helper function to create a new claim"""
-    import uuid
     return Claim(
-        id=str(uuid.uuid4()),
+        id=_fast_id(),
         text=text,
         type=claim_type,
         transcription_id=transcription_id,
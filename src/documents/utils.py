@@ -0,0 +1,11 @@
+"""
+Shared helpers for the document modules
+"""
+
+import asyncio
+from functools import partial
+
+
+async def run_in_thread(func, *args):
+    """Run func(*args) on the default executor (asyncio.to_thread needs 3.9; the Jetson runs 3.8)"""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
@@ -4,34 +4,96 @@ Uses Qdrant for vector storage and similarity search
 """
 
 import asyncio
+import atexit
 import logging
 import json
 import os
 import numpy as np
+import platform
 import re
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, field, asdict
 from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache
 import hashlib
 import uuid
 
 from .processor import DocumentInfo
+from .utils import run_in_thread
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import simsimd
+    # BH_DISABLE_SIMSIMD=1 forces the NumPy path, e.g. to compare scores
+    SIMSIMD_AVAILABLE = os.environ.get("BH_DISABLE_SIMSIMD", "").strip().lower() not in ("1", "true", "yes")
+except ImportError:
+    SIMSIMD_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+def _dumps_json(obj: Any) -> bytes:
+    """Encode obj as compact JSON bytes, with orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode('utf-8')
+
+def _loads_json(data: bytes) -> Any:
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+def _read_json(path: str) -> Any:
+    """Parse a JSON file, with orjson when available"""
+    with open(path, 'rb') as f:
+        return _loads_json(f.read())
+
+def _write_json(path: str, obj: Any):
+    """Write obj as compact JSON, with orjson when available"""
+    with open(path, 'wb') as f:
+        f.write(_dumps_json(obj))
+
+# Local-mode keyword tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+@lru_cache(maxsize=4096)
+def _token_set(content: str) -> frozenset:
+    """Distinct keyword tokens of a chunk, memoized across searches"""
+    return frozenset(_TOKEN_RE.findall(content.lower()))
+
+def _cosine_scores(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine similarity of query against each row of matrix (both normalized)"""
+    if SIMSIMD_AVAILABLE:
+        # SIMD cosine kernels picked for the CPU at runtime (AVX-512/AVX2/NEON)
+        distances = simsimd.cdist(query[np.newaxis, :], matrix, metric="cosine")
+        return 1.0 - np.asarray(distances, dtype=np.float32)[0]
+    return matrix @ query
+
+# Code points of '.', '!' and '?', where chunks prefer to break
+_SENTENCE_END_CODEPOINTS = np.array([ord(c) for c in '.!?'], dtype=np.uint32)
+
+@dataclass(frozen=True)
 class DocumentChunk:
-    """A chunk of text from a document with vector embedding"""
+    """A chunk of text from a document with vector embedding
+    
+    embedding, when set, is a float32 array of shape (384,).
+    """
     chunk_id: str
     document_id: str
     content: str
     chunk_index: int
     start_pos: int
     end_pos: int
-    embedding: Optional[List[float]] = None
-    metadata: Dict[str, Any] = None
+    embedding: Optional[np.ndarray] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(frozen=True)
 class SearchResult:
     """Result from vector search"""
     document_id: str
@@ -40,9 +102,111 @@ class SearchResult:
     score: float
     metadata: Dict[str, Any]
 
+class _OnnxEmbedder:
+    """all-MiniLM-L6-v2 on ONNX Runtime, with the subset of the
+    SentenceTransformer.encode API the vector store uses"""
+    
+    MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+    MAX_SEQ_LENGTH = 256
+    
+    QUANTIZED_FILE = 'model_quantized.onnx'
+    
+    def __init__(self, model_path: Optional[str] = None, provider: str = 'CPUExecutionProvider',
+                 cache_dir: Optional[str] = None, num_threads: Optional[int] = None):
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        
+        session_options = onnxruntime.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+        
+        file_name = None
+        if not model_path and cache_dir and provider == 'CPUExecutionProvider':
+            # int8 model exported and quantized once, then reused from disk
+            if not os.path.exists(os.path.join(cache_dir, self.QUANTIZED_FILE)):
+                self._export_quantized(cache_dir)
+            model_path, file_name = cache_dir, self.QUANTIZED_FILE
+        
+        if model_path:
+            # Pre-exported (e.g. int8-quantized) model directory
+            self.model = ORTModelForFeatureExtraction.from_pretrained(
+                model_path, file_name=file_name, provider=provider, session_options=session_options
+            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        else:
+            self.model = ORTModelForFeatureExtraction.from_pretrained(
+                self.MODEL_ID, export=True, provider=provider, session_options=session_options
+            )
+            self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL_ID)
+    
+    @classmethod
+    def _export_quantized(cls, cache_dir: str):
+        """Export the model to ONNX and dynamically quantize its weights to int8"""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        logger.info(f"🔧 Exporting int8 ONNX embedding model to {cache_dir}...")
+        model = ORTModelForFeatureExtraction.from_pretrained(cls.MODEL_ID, export=True)
+        quantizer = ORTQuantizer.from_pretrained(model)
+        # Dynamic int8 quantization tuned for this CPU: ARM64 (Jetson) or x86 VNNI
+        if platform.machine().lower() in ("aarch64", "arm64"):
+            config = AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+        else:
+            config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=cache_dir, quantization_config=config)
+        AutoTokenizer.from_pretrained(cls.MODEL_ID).save_pretrained(cache_dir)
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+    
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        # Length-sorted batches, like SentenceTransformer.encode
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        embeddings = np.empty((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for i in range(0, len(texts), batch_size):
+            idx = order[i:i + batch_size]
+            features = self.tokenizer(
+                [texts[j] for j in idx], padding=True, truncation=True,
+                max_length=self.MAX_SEQ_LENGTH, return_tensors='np'
+            )
+            hidden = self.model(**features).last_hidden_state
+            # Mean pooling over real tokens
+            mask = features['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[idx] = pooled
+        
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
 class VectorStore:
     """Vector database for document storage and retrieval"""
     
+    # Texts at least this long find sentence boundaries with one NumPy pass
+    CHUNK_VECTORIZE_MIN_CHARS = 10000
+    # Chunks per forward pass; with length-sorted batches, smaller batches
+    # waste less padding on CPU
+    EMBEDDING_BATCH_SIZE = 32
+    # Points per Qdrant upsert request
+    UPSERT_BATCH_SIZE = 256
+    # Chunks per encode step when embedding overlaps with uploading
+    PIPELINE_BATCH_SIZE = 64
+    # Chunk embeddings kept in memory, keyed by content hash
+    EMBEDDING_CACHE_SIZE = 50000
+    # Recent query embeddings, keyed by normalized query text
+    QUERY_CACHE_SIZE = 1024
+    # Minimum seconds between full rewrites of the document registry
+    REGISTRY_FLUSH_INTERVAL = 2.0
+    # Registry fields shared by every chunk of a document
+    DOCUMENT_METADATA_FIELDS = (
+        "filename", "file_type", "upload_time", "tags", "context", "category", "related_documents"
+    )
+    
     def __init__(self, collection_name: str = "documents", data_dir: str = None):
         self.collection_name = collection_name
         self.is_initialized = False
@@ -51,6 +215,26 @@ class VectorStore:
         self.documents = {}  # Track uploaded documents: {doc_id: doc_info}
         # Prevent concurrent writers corrupting local JSON registry/chunk files.
         self._local_write_lock = asyncio.Lock()
+        # Upserts in flight across all documents; more than ~2 concurrent
+        # requests slows Qdrant ingestion down rather than up
+        self._upsert_semaphore = asyncio.Semaphore(2)
+        # LRU of chunk embeddings; encoding runs in worker threads, hence the lock
+        self._emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Whether the local chunk database has its FTS5 keyword index
+        self._fts_available = False
+        # Stacked chunk embeddings for dense local search, built on first
+        # search and dropped whenever chunks change (the version guards
+        # against installing a matrix built from a stale read)
+        self._local_matrix: Optional[Tuple[np.ndarray, List[Tuple[str, int]]]] = None
+        self._local_matrix_version = 0
+        self._local_matrix_lock = threading.Lock()
+        # Coalesced registry writes, see _save_documents_registry
+        self._registry_dirty = False
+        self._last_registry_flush = 0.0
+        self._registry_flush_handle: Optional[asyncio.TimerHandle] = None
+        atexit.register(self._flush_registry)
         
         # Set up persistent storage directory
         if data_dir is None:
@@ -59,6 +243,9 @@ class VectorStore:
         self.qdrant_path = os.path.join(data_dir, 'qdrant_storage')
         self.documents_file = os.path.join(data_dir, 'documents_registry.json')
         self.local_chunks_dir = os.path.join(data_dir, 'documents_chunks')
+        self.local_db_path = os.path.join(data_dir, 'local_store.sqlite')
+        self._db: Optional[sqlite3.Connection] = None
+        self._reader_local = threading.local()
         
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
@@ -82,29 +269,68 @@ class VectorStore:
             # If Qdrant/embeddings aren't available, fall back to a lightweight local store so
             # document upload and validation can still work (with naive keyword search).
             self.mode = "qdrant" if (self.qdrant_available and self.embedding_available) else "local"
+        
+        # Dense scoring in local mode. Opt-in: forced local mode is usually
+        # chosen to keep the embedding model off the device.
+        self.local_embeddings = (
+            self.mode == "local" and self.embedding_available
+            and os.environ.get("BH_LOCAL_EMBEDDINGS", "").strip().lower() in ("1", "true", "yes")
+        )
     
     def _load_documents_registry(self):
         """Load document registry from disk"""
         try:
             if os.path.exists(self.documents_file):
-                with open(self.documents_file, 'r') as f:
-                    self.documents = json.load(f)
+                self.documents = _read_json(self.documents_file)
                 logger.info(f"📂 Loaded {len(self.documents)} documents from registry")
         except Exception as e:
             logger.warning(f"Failed to load documents registry: {e}")
             self.documents = {}
     
     def _save_documents_registry(self):
-        """Save document registry to disk"""
+        """Mark the registry for saving; writes are coalesced.
+        
+        The whole file is rewritten on every flush, so during bulk ingests it
+        is written at most once per REGISTRY_FLUSH_INTERVAL instead of once
+        per document. A pending write is scheduled on the event loop and
+        flushed at exit.
+        """
+        self._registry_dirty = True
+        elapsed = time.monotonic() - self._last_registry_flush
+        if elapsed >= self.REGISTRY_FLUSH_INTERVAL:
+            self._flush_registry()
+            return
+        if self._registry_flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._flush_registry()
+                return
+            self._registry_flush_handle = loop.call_later(
+                self.REGISTRY_FLUSH_INTERVAL - elapsed, self._flush_registry
+            )
+    
+    def _flush_registry(self):
+        """Write the document registry to disk if it has unsaved changes"""
+        if self._registry_flush_handle is not None:
+            self._registry_flush_handle.cancel()
+            self._registry_flush_handle = None
+        if not self._registry_dirty:
+            return
         try:
             tmp_path = f"{self.documents_file}.tmp"
-            with open(tmp_path, "w") as f:
-                # Avoid pretty-print here; this file can grow and we want it fast/atomic.
-                json.dump(self.documents, f, default=str)
+            # Avoid pretty-print here; this file can grow and we want it fast/atomic.
+            _write_json(tmp_path, self.documents)
             os.replace(tmp_path, self.documents_file)
+            self._registry_dirty = False
             logger.info(f"💾 Saved {len(self.documents)} documents to registry")
         except Exception as e:
             logger.error(f"Failed to save documents registry: {e}")
+        self._last_registry_flush = time.monotonic()
+    
+    async def flush(self):
+        """Persist any pending registry changes now"""
+        self._flush_registry()
         
     def _check_qdrant(self) -> bool:
         """Check if Qdrant is available"""
@@ -128,43 +354,188 @@ class VectorStore:
             logger.warning(f"SentenceTransformers check failed with {type(e).__name__}: {e}")
             return False
     
+    def _select_embedding_device(self) -> str:
+        """Pick the embedding device from BH_EMBEDDING_DEVICE (cpu, cuda or auto)"""
+        requested = (os.environ.get("BH_EMBEDDING_DEVICE") or "cpu").strip().lower()
+        if requested in ("cuda", "auto"):
+            import torch
+            if torch.cuda.is_available():
+                return "cuda"
+            if requested == "cuda":
+                logger.warning("BH_EMBEDDING_DEVICE=cuda but CUDA is not available - using CPU")
+        return "cpu"
+    
+    def _embedding_backend(self) -> str:
+        """Embedding backend from BH_EMBEDDING_BACKEND (torch or onnx)"""
+        backend = (os.environ.get("BH_EMBEDDING_BACKEND") or "torch").strip().lower()
+        return "onnx" if backend == "onnx" else "torch"
+    
+    def _load_onnx_embedder(self, device: str) -> Optional[_OnnxEmbedder]:
+        """Load the ONNX Runtime embedder, or None to fall back to torch.
+        
+        BH_EMBEDDING_ONNX_PATH may point at a pre-exported model directory.
+        Otherwise, on CPU, an int8-quantized export is created under the data
+        directory on first load and reused afterwards; on CUDA the fp32 model
+        is exported from the hub.
+        """
+        provider = 'CUDAExecutionProvider' if device == 'cuda' else 'CPUExecutionProvider'
+        requested = os.environ.get("SBERT_NUM_THREADS", "").strip()
+        num_threads = int(requested) if requested.isdigit() and int(requested) > 0 else min(8, os.cpu_count() or 1)
+        try:
+            logger.info(f"🧠 Loading ONNX embedding model ({provider})...")
+            return _OnnxEmbedder(
+                os.environ.get("BH_EMBEDDING_ONNX_PATH") or None,
+                provider=provider,
+                cache_dir=os.path.join(self.data_dir, 'embedding_onnx_int8'),
+                num_threads=num_threads
+            )
+        except ImportError as e:
+            logger.warning(f"ONNX backend not available - install with: pip install optimum[onnxruntime] (ImportError: {e})")
+        except Exception as e:
+            logger.warning(f"ONNX embedding model failed to load, using torch: {e}")
+        return None
+    
+    def _limit_torch_threads(self):
+        """Bound torch CPU threads before the embedding model is built.
+        
+        Uses SBERT_NUM_THREADS if set, otherwise caps at 8: beyond that,
+        thread synchronization costs more than it gains on a small encoder.
+        """
+        import torch
+        requested = os.environ.get("SBERT_NUM_THREADS", "").strip()
+        if requested.isdigit() and int(requested) > 0:
+            torch.set_num_threads(int(requested))
+        elif torch.get_num_threads() > 8:
+            torch.set_num_threads(8)
+        
+        try:
+            torch.set_num_interop_threads(2)
+        except RuntimeError:
+            # Only settable before torch has started any parallel work
+            pass
+    
+    def _load_embedding_model(self):
+        """Load the embedding model (CPU by default to save GPU memory for Whisper)"""
+        device = self._select_embedding_device()
+        if self._embedding_backend() == "onnx":
+            self.embedding_model = self._load_onnx_embedder(device)
+        if self.embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            if device == 'cpu':
+                self._limit_torch_threads()
+            logger.info(f"🧠 Loading embedding model on {device}...")
+            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+            if device == 'cuda' and os.environ.get("BH_EMBEDDING_FP16", "1").strip().lower() not in ("0", "false", "no"):
+                # Half precision doubles GPU throughput; embeddings drift only slightly
+                self.embedding_model.half()
+            # Set once here; the direct forward path never calls encode(),
+            # which would otherwise do it on every call
+            self.embedding_model.eval()
+            if not getattr(self.embedding_model.tokenizer, "is_fast", False):
+                logger.warning("Embedding tokenizer is the slow Python implementation - install tokenizers for the Rust one")
+        
+        # Cached vectors belong to the previous model, if any
+        self._query_cache.clear()
+        with self._emb_cache_lock:
+            self._emb_cache.clear()
+    
     async def initialize(self) -> bool:
         """Initialize the vector store"""
         try:
             if self.mode == "local":
+                self._open_local_db()
+                if self.local_embeddings:
+                    self._load_embedding_model()
+                    self._backfill_local_embeddings()
                 self.is_initialized = True
                 logger.info("✅ Vector store initialized in LOCAL fallback mode")
                 return True
             
             logger.info("🔧 Initializing vector store...")
             
-            # Initialize Qdrant client (in-memory for now)
-            from qdrant_client import QdrantClient
-            from qdrant_client.models import Distance, VectorParams
+            # Initialize Qdrant client (async, so storage calls don't block the event loop)
+            from qdrant_client import AsyncQdrantClient
+            from qdrant_client.models import (
+                Distance, VectorParams, HnswConfigDiff, PayloadSchemaType,
+                ScalarQuantization, ScalarQuantizationConfig, ScalarType
+            )
             
-            # Use persistent storage on disk
-            self.client = QdrantClient(path=self.qdrant_path)
-            logger.info(f"📂 Qdrant using persistent storage at: {self.qdrant_path}")
+            qdrant_host = (os.environ.get("BH_QDRANT_HOST") or "").strip()
+            if qdrant_host:
+                # Standalone Qdrant server: gRPC/protobuf instead of REST/JSON
+                # for upserts and searches
+                self.client = AsyncQdrantClient(
+                    host=qdrant_host,
+                    port=int(os.environ.get("BH_QDRANT_PORT", "6333")),
+                    grpc_port=int(os.environ.get("BH_QDRANT_GRPC_PORT", "6334")),
+                    prefer_grpc=True,
+                    timeout=30
+                )
+                logger.info(f"📡 Qdrant using server at {qdrant_host} (gRPC)")
+            else:
+                # Use persistent storage on disk
+                self.client = AsyncQdrantClient(path=self.qdrant_path)
+                logger.info(f"📂 Qdrant using persistent storage at: {self.qdrant_path}")
             
-            # Initialize embedding model on CPU to save GPU memory for Whisper
-            from sentence_transformers import SentenceTransformer
-            logger.info("🧠 Loading embedding model (CPU to save GPU for Whisper)...")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')  # Lightweight model on CPU
+            self._load_embedding_model()
+            
+            # int8 copies of the vectors for search (4x smaller), kept in RAM;
+            # originals are kept on disk for rescoring
+            quantization_config = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=True
+                )
+            )
+            # Pinned graph settings: default degree, slightly wider build
+            # beam; raising m further mostly slows down inserts
+            hnsw_config = HnswConfigDiff(m=16, ef_construct=128)
             
             # Create collection if it doesn't exist
             try:
-                collection_info = self.client.get_collection(self.collection_name)
+                collection_info = await self.client.get_collection(self.collection_name)
                 logger.info(f"📚 Using existing collection: {self.collection_name}")
             except:
                 # Create new collection
-                self.client.create_collection(
+                await self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=384,  # all-MiniLM-L6-v2 embedding size
-                        distance=Distance.COSINE
-                    )
+                        # Vectors are L2-normalized on our side, so dot product
+                        # equals cosine without Qdrant renormalizing them
+                        distance=Distance.DOT,
+                        # fp32 originals are only read for rescoring, so they
+                        # can stay memory-mapped on disk
+                        on_disk=True
+                    ),
+                    on_disk_payload=True,
+                    hnsw_config=hnsw_config,
+                    quantization_config=quantization_config
                 )
                 logger.info(f"📚 Created new collection: {self.collection_name}")
+                collection_info = None
+            
+            if collection_info is not None and collection_info.config.quantization_config is None:
+                # Collections from older versions: quantize in place
+                try:
+                    await self.client.update_collection(
+                        collection_name=self.collection_name,
+                        quantization_config=quantization_config,
+                        hnsw_config=hnsw_config
+                    )
+                    logger.info(f"📚 Enabled int8 quantization on: {self.collection_name}")
+                except Exception as e:
+                    logger.warning(f"Could not enable quantization on existing collection: {e}")
+            
+            # Keyword index so per-document scroll/delete filters don't scan
+            # the whole collection; collections from older versions get it too
+            if collection_info is None or "metadata.document_id" not in (collection_info.payload_schema or {}):
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name="metadata.document_id",
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
             
             self.is_initialized = True
             logger.info("✅ Vector store initialized successfully")
@@ -175,10 +546,28 @@ class VectorStore:
             return False
     
     def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks"""
+        """Split text into overlapping chunks
+        
+        Overlap text is embedded once per chunk it appears in. MiniLM is a
+        bidirectional encoder, so overlap tokens' hidden states depend on the
+        whole window and cannot be shared between neighbouring chunks.
+        """
         if len(text) <= chunk_size:
             return [text]
         
+        # Long texts: every sentence-ending position in one vectorized pass.
+        # ASCII bytes index like the str itself; other text goes through
+        # UTF-32 so array indices still equal str indices. Short texts are
+        # cheaper to scan per chunk with rfind.
+        sentence_marks = None
+        if len(text) >= self.CHUNK_VECTORIZE_MIN_CHARS:
+            if text.isascii():
+                raw = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+                sentence_marks = np.flatnonzero((raw == ord('.')) | (raw == ord('!')) | (raw == ord('?')))
+            else:
+                codepoints = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+                sentence_marks = np.flatnonzero(np.isin(codepoints, _SENTENCE_END_CODEPOINTS))
+        
         chunks = []
         start = 0
         
@@ -190,11 +579,14 @@ class VectorStore:
                 # Look for sentence endings within the last 100 characters
                 search_start = max(start + chunk_size - 100, start)
                 sentence_end = -1
-                
-                for i in range(end, search_start, -1):
-                    if text[i] in '.!?':
-                        sentence_end = i + 1
-                        break
+                if sentence_marks is None:
+                    last_mark = max(text.rfind(c, search_start + 1, end + 1) for c in '.!?')
+                    if last_mark >= 0:
+                        sentence_end = last_mark + 1
+                else:
+                    idx = np.searchsorted(sentence_marks, end, side='right')
+                    if idx > 0 and sentence_marks[idx - 1] > search_start:
+                        sentence_end = int(sentence_marks[idx - 1]) + 1
                 
                 if sentence_end > start:
                     end = sentence_end
@@ -210,28 +602,258 @@ class VectorStore:
         
         return chunks
     
-    def _generate_embedding(self, text: str) -> List[float]:
+    def _generate_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text"""
         if not self.embedding_model:
             raise RuntimeError("Embedding model not initialized")
         
-        embedding = self.embedding_model.encode(text)
-        return embedding.tolist()
+        return self._encode_batch([text])[0]
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode texts to L2-normalized float32 vectors, in input order.
+        
+        The torch backend calls the model's (Rust) fast tokenizer on each batch
+        and runs the forward pass directly under inference_mode, skipping
+        encode()'s and tokenize()'s per-call Python setup.
+        """
+        if isinstance(self.embedding_model, _OnnxEmbedder):
+            return self.embedding_model.encode(
+                texts, batch_size=self.EMBEDDING_BATCH_SIZE, normalize_embeddings=True
+            )
+        
+        import torch
+        model = self.embedding_model
+        embeddings = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Longest first so each batch pads only to its own longest text
+        order = np.argsort([-len(t) for t in texts], kind='stable')
+        with torch.inference_mode():
+            for i in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
+                idx = order[i:i + self.EMBEDDING_BATCH_SIZE]
+                features = model.tokenizer(
+                    [texts[j] for j in idx], padding=True, truncation=True,
+                    max_length=model.max_seq_length, return_tensors='pt'
+                )
+                features = {k: v.to(model.device) for k, v in features.items()}
+                out = model.forward(features)['sentence_embedding']
+                out = torch.nn.functional.normalize(out, p=2, dim=1)
+                embeddings[idx] = out.float().cpu().numpy()
+        return embeddings
+    
+    def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for many texts in one batched call
+        
+        _encode_batch length-sorts its inputs before batching and restores the
+        original order afterwards, so each minibatch is padded only to its own
+        longest chunk. Passing the whole list at once is what enables that;
+        texts must not be pre-truncated or pre-padded. Texts already in the
+        embedding cache (e.g. chunks repeated across document versions) are
+        not re-encoded.
+        """
+        if not self.embedding_model:
+            raise RuntimeError("Embedding model not initialized")
+        
+        keys = [hashlib.blake2b(text.encode(), digest_size=16).hexdigest() for text in texts]
+        with self._emb_cache_lock:
+            vectors = [self._emb_cache.get(key) for key in keys]
+            for key, vector in zip(keys, vectors):
+                if vector is not None:
+                    self._emb_cache.move_to_end(key)
+        
+        # Encode only texts not seen before, each distinct text once
+        misses = {key: text for key, text, vector in zip(keys, texts, vectors) if vector is None}
+        if misses:
+            encoded = self._encode_batch(list(misses.values()))
+            fresh = dict(zip(misses, encoded))
+            with self._emb_cache_lock:
+                self._emb_cache.update(fresh)
+                while len(self._emb_cache) > self.EMBEDDING_CACHE_SIZE:
+                    self._emb_cache.popitem(last=False)
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        
+        if not vectors:
+            return self._encode_batch([])
+        return np.stack(vectors)
+
+    async def _upsert_points(self, points: List[Any]):
+        """Upsert points in sub-batches, at most two requests in flight"""
+        async def upsert(batch: List[Any]):
+            async with self._upsert_semaphore:
+                await self.client.upsert(collection_name=self.collection_name, points=batch)
+        
+        await asyncio.gather(*(
+            upsert(points[i:i + self.UPSERT_BATCH_SIZE])
+            for i in range(0, len(points), self.UPSERT_BATCH_SIZE)
+        ))
 
     def _local_chunks_path(self, document_id: str) -> str:
+        """Per-document JSON chunk file used before the SQLite store"""
         return os.path.join(self.local_chunks_dir, f"{document_id}.json")
+    
+    def _open_local_db(self):
+        """Open the local-mode chunk database, importing legacy JSON chunk files"""
+        self._db = sqlite3.connect(self.local_db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " doc_id TEXT NOT NULL, idx INTEGER NOT NULL, chunk_id TEXT NOT NULL,"
+            " content TEXT NOT NULL, metadata BLOB NOT NULL,"
+            " PRIMARY KEY (doc_id, idx)) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+        if "tokens" not in columns:
+            # Space-joined distinct keyword tokens; NULL for older rows
+            self._db.execute("ALTER TABLE chunks ADD COLUMN tokens TEXT")
+        if "embedding" not in columns:
+            # Normalized float32 vector bytes when local embeddings are on
+            self._db.execute("ALTER TABLE chunks ADD COLUMN embedding BLOB")
+        try:
+            # C-level inverted index with BM25 ranking for keyword search. It
+            # indexes the stored _TOKEN_RE tokens, not the content, so words
+            # with diacritics split the same way in the index and the query
+            fts_columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks_fts)")}
+            if "content" in fts_columns:
+                # Earlier index over the raw content
+                self._db.execute("DROP TABLE chunks_fts")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                "tokens, doc_id UNINDEXED, idx UNINDEXED)"
+            )
+            self._fts_available = True
+            # Fill the index for chunks stored before it existed
+            if not self._db.execute("SELECT 1 FROM chunks_fts LIMIT 1").fetchone():
+                with self._db:
+                    untokenized = self._db.execute(
+                        "SELECT doc_id, idx, content FROM chunks WHERE tokens IS NULL"
+                    ).fetchall()
+                    self._db.executemany(
+                        "UPDATE chunks SET tokens = ? WHERE doc_id = ? AND idx = ?",
+                        [(" ".join(_token_set(content)), doc_id, idx) for doc_id, idx, content in untokenized]
+                    )
+                    self._db.execute("INSERT INTO chunks_fts (tokens, doc_id, idx) SELECT tokens, doc_id, idx FROM chunks")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 not available - local search will scan all chunks ({e})")
+        
+        # Keyword index file from before FTS5; superseded by chunks_fts.
+        # Legacy files are renamed, not deleted, so a downgrade can restore them.
+        legacy_index = os.path.join(self.data_dir, 'inverted_index.json')
+        if os.path.exists(legacy_index):
+            os.replace(legacy_index, legacy_index + '.migrated')
+        
+        migrated = 0
+        for doc_id in self.documents:
+            chunks_path = self._local_chunks_path(doc_id)
+            if not os.path.exists(chunks_path):
+                continue
+            try:
+                self._write_local_chunks(doc_id, _read_json(chunks_path))
+                os.replace(chunks_path, chunks_path + '.migrated')
+                migrated += 1
+            except Exception as e:
+                logger.warning(f"Failed to import chunk file for {doc_id}: {e}")
+        if migrated:
+            logger.info(f"📦 Imported {migrated} chunk files into {self.local_db_path}")
+    
+    def _local_reader(self) -> sqlite3.Connection:
+        """This thread's read connection to the local chunk database
+        
+        WAL lets readers on worker threads run alongside the writer, which
+        keeps using self._db on the event loop thread.
+        """
+        db = getattr(self._reader_local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.local_db_path)
+            self._reader_local.db = db
+        return db
+    
+    def _write_local_chunks(self, document_id: str, chunks: List[Dict[str, Any]],
+                            embeddings: Optional[np.ndarray] = None):
+        """Replace a document's chunks in one transaction"""
+        tokens = [" ".join(_token_set(ch.get("content", ""))) for ch in chunks]
+        with self._db:
+            self._delete_local_chunks(document_id)
+            self._db.executemany(
+                "INSERT INTO chunks (doc_id, idx, chunk_id, content, metadata, tokens, embedding)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        document_id, idx, ch.get("chunk_id", ""), ch.get("content", ""),
+                        _dumps_json(ch.get("metadata") or {}), tokens[idx],
+                        embeddings[idx].astype(np.float32).tobytes() if embeddings is not None else None
+                    )
+                    for idx, ch in enumerate(chunks)
+                ]
+            )
+            if self._fts_available:
+                self._db.executemany(
+                    "INSERT INTO chunks_fts (tokens, doc_id, idx) VALUES (?, ?, ?)",
+                    [(tokens[idx], document_id, idx) for idx in range(len(chunks))]
+                )
+        self._invalidate_local_matrix()
+    
+    def _delete_local_chunks(self, document_id: str):
+        """Delete a document's chunks; call inside a transaction"""
+        self._db.execute("DELETE FROM chunks WHERE doc_id = ?", (document_id,))
+        if self._fts_available:
+            self._db.execute("DELETE FROM chunks_fts WHERE doc_id = ?", (document_id,))
+    
+    def _read_local_chunks(self, document_id: str) -> List[Tuple[int, str, str, Dict[str, Any]]]:
+        """A document's chunks as (index, chunk_id, content, metadata), in order"""
+        rows = self._db.execute(
+            "SELECT idx, chunk_id, content, metadata FROM chunks WHERE doc_id = ? ORDER BY idx",
+            (document_id,)
+        ).fetchall()
+        return [(idx, chunk_id, content, _loads_json(metadata)) for idx, chunk_id, content, metadata in rows]
 
+    def _backfill_local_embeddings(self):
+        """Embed chunks stored while local embeddings were off"""
+        rows = self._db.execute(
+            "SELECT doc_id, idx, content FROM chunks WHERE embedding IS NULL"
+        ).fetchall()
+        if not rows:
+            return
+        logger.info(f"🧠 Embedding {len(rows)} local chunks...")
+        for i in range(0, len(rows), self.PIPELINE_BATCH_SIZE):
+            batch = rows[i:i + self.PIPELINE_BATCH_SIZE]
+            embeddings = self._encode_batch([content for _, _, content in batch])
+            with self._db:
+                self._db.executemany(
+                    "UPDATE chunks SET embedding = ? WHERE doc_id = ? AND idx = ?",
+                    [
+                        (embedding.astype(np.float32).tobytes(), doc_id, idx)
+                        for (doc_id, idx, _), embedding in zip(batch, embeddings)
+                    ]
+                )
+        self._invalidate_local_matrix()
+    
+    def _invalidate_local_matrix(self):
+        with self._local_matrix_lock:
+            self._local_matrix = None
+            self._local_matrix_version += 1
+    
+    def _local_embedding_matrix(self) -> Tuple[np.ndarray, List[Tuple[str, int]]]:
+        """All stored chunk embeddings as one (n, dim) matrix plus their (doc_id, idx) keys"""
+        with self._local_matrix_lock:
+            if self._local_matrix is not None:
+                return self._local_matrix
+            version = self._local_matrix_version
+        
+        rows = self._local_reader().execute(
+            "SELECT doc_id, idx, embedding FROM chunks WHERE embedding IS NOT NULL"
+        ).fetchall()
+        keys = [(doc_id, idx) for doc_id, idx, _ in rows]
+        # One contiguous buffer, no per-row arrays
+        matrix = np.frombuffer(b"".join(blob for _, _, blob in rows), dtype=np.float32)
+        matrix = matrix.reshape(len(rows), -1) if rows else matrix.reshape(0, 0)
+        
+        with self._local_matrix_lock:
+            if self._local_matrix_version == version:
+                self._local_matrix = (matrix, keys)
+        return matrix, keys
+    
     def _tokenize(self, text: str) -> List[str]:
-        return re.findall(r"[a-z0-9]+", (text or "").lower())
+        return _TOKEN_RE.findall(text.lower()) if text else []
 
-    def _local_score(self, query: str, content: str) -> float:
-        q = set(self._tokenize(query))
-        if not q:
-            return 0.0
-        c = set(self._tokenize(content))
-        overlap = len(q & c)
-        return overlap / max(1, len(q))
-    
     async def store_document(self, doc_info: DocumentInfo) -> bool:
         """Store a document in the vector database"""
         if not self.is_initialized:
@@ -271,102 +893,308 @@ class VectorStore:
                         }
                     )
 
+                embeddings = None
+                if self.local_embeddings:
+                    embeddings = await run_in_thread(self._generate_embeddings, chunks)
+
                 async with self._local_write_lock:
-                    # Persist chunk data (atomic write)
-                    chunks_path = self._local_chunks_path(doc_info.id)
-                    tmp_chunks_path = f"{chunks_path}.tmp"
-                    with open(tmp_chunks_path, "w") as f:
-                        json.dump(local_chunks, f)
-                    os.replace(tmp_chunks_path, chunks_path)
+                    # Persist chunk data (one transaction)
+                    self._write_local_chunks(doc_info.id, local_chunks, embeddings)
 
                     # Track document in registry
-                    self.documents[doc_info.id] = {
-                        "id": doc_info.id,
-                        "filename": doc_info.filename,
-                        "file_type": doc_info.file_type,
-                        "file_size": doc_info.file_size,
-                        "text_length": len(doc_info.content),
-                        "upload_time": doc_info.upload_time.isoformat(),
-                        "tags": doc_info.tags if doc_info.tags else [],
-                        "category": doc_info.category,
-                        "chunk_count": len(local_chunks),
-                    }
+                    self.documents[doc_info.id] = self._registry_entry(doc_info, len(local_chunks))
                     self._save_documents_registry()
 
+
                 logger.info(f"✅ Stored {len(local_chunks)} chunks for document (local): {doc_info.filename}")
                 return True
             
-            # Process each chunk
-            points = []
-            for i, chunk_text in enumerate(chunks):
-                # Generate chunk ID as a proper UUID
-                chunk_id = str(uuid.uuid4())
-                
-                # Generate embedding
-                embedding = self._generate_embedding(chunk_text)
-                
-                # Create chunk metadata
-                chunk_metadata = {
-                    "document_id": doc_info.id,
-                    "chunk_index": i,
-                    "filename": doc_info.filename,
-                    "file_type": doc_info.file_type,
-                    "upload_time": doc_info.upload_time.isoformat(),
-                    "content_preview": chunk_text[:100] + "..." if len(chunk_text) > 100 else chunk_text,
-                    "chunk_length": len(chunk_text),
-                    "tags": doc_info.tags if doc_info.tags else [],
-                    "context": doc_info.context,
-                    "category": doc_info.category,
-                    "related_documents": doc_info.related_documents if doc_info.related_documents else []
-                }
-                
-                # Create point for Qdrant
-                from qdrant_client.models import PointStruct
-                point = PointStruct(
-                    id=chunk_id,
-                    vector=embedding,
-                    payload={
-                        "content": chunk_text,
-                        "metadata": chunk_metadata
-                    }
-                )
-                points.append(point)
+            # Embed and store in Qdrant, overlapping the two
+            stored = await self._embed_and_upsert([(doc_info.id, chunks)])
             
-            # Store in Qdrant
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
-            
-            # Track document in registry
-            self.documents[doc_info.id] = {
-                "id": doc_info.id,
-                "filename": doc_info.filename,
-                "file_type": doc_info.file_type,
-                "file_size": doc_info.file_size,
-                "text_length": len(doc_info.content),
-                "upload_time": doc_info.upload_time.isoformat(),
-                "tags": doc_info.tags if doc_info.tags else [],
-                "category": doc_info.category,
-                "chunk_count": len(points)
-            }
-            
-            # Save registry to disk for persistence
+            # Track document in registry and save to disk for persistence
+            self.documents[doc_info.id] = self._registry_entry(doc_info, stored)
             self._save_documents_registry()
             
-            logger.info(f"✅ Stored {len(points)} chunks for document: {doc_info.filename}")
+            logger.info(f"✅ Stored {stored} chunks for document: {doc_info.filename}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to store document {doc_info.filename}: {e}")
             return False
     
+    async def _embed_and_upsert(self, doc_chunks: List[Tuple[str, List[str]]]) -> int:
+        """Embed (document_id, chunks) pairs in sub-batches while earlier
+        sub-batches upload.
+        
+        An upload worker drains a queue of at most two pending batches, so
+        encoding batch N+1 overlaps with Qdrant ingesting batch N and memory
+        stays flat however many chunks are stored. Returns the number of
+        points stored.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        
+        async def upload_worker():
+            while True:
+                points = await queue.get()
+                if points is None:
+                    return
+                await self._upsert_points(points)
+        
+        # Sub-batches follow length order, not text order, so each one holds
+        # similar-length chunks and pads little
+        items = [
+            (document_id, index, chunk_text)
+            for document_id, chunks in doc_chunks
+            for index, chunk_text in enumerate(chunks)
+        ]
+        items.sort(key=lambda item: len(item[2]))
+        
+        async def enqueue(points: Optional[List[Any]]) -> bool:
+            """Queue points for the worker; False if it died instead of taking them"""
+            put = asyncio.ensure_future(queue.put(points))
+            # Race the put against the worker rather than block on a full queue
+            await asyncio.wait({put, worker}, return_when=asyncio.FIRST_COMPLETED)
+            if worker.done():
+                put.cancel()
+                return False
+            return True
+        
+        worker = asyncio.create_task(upload_worker())
+        try:
+            for start in range(0, len(items), self.PIPELINE_BATCH_SIZE):
+                batch = items[start:start + self.PIPELINE_BATCH_SIZE]
+                embeddings = await run_in_thread(self._generate_embeddings, [item[2] for item in batch])
+                if not await enqueue(self._build_points(batch, embeddings)):
+                    break
+            else:
+                await enqueue(None)
+            # Re-raises the upsert error if the worker died
+            await worker
+        finally:
+            worker.cancel()
+        return len(items)
+    
+    @staticmethod
+    def _chunk_uuid(document_id: str, index: int, chunk_text: str) -> str:
+        """Deterministic point ID for a chunk
+        
+        Re-uploading a document overwrites its unchanged chunks instead of
+        duplicating them; blake2b avoids uuid4()'s entropy reads, which can
+        be slow on embedded Linux.
+        """
+        digest = hashlib.blake2b(f"{document_id}:{index}:{chunk_text}".encode(), digest_size=16).digest()
+        return str(uuid.UUID(bytes=digest))
+    
+    def _build_points(self, items: List[Tuple[str, int, str]], embeddings: np.ndarray) -> List[Any]:
+        """Build Qdrant points from (document_id, chunk_index, chunk_text)
+        items and their embeddings"""
+        from qdrant_client.models import PointStruct
+        
+        # One C-level conversion for the whole matrix; PointStruct validates
+        # vectors as lists of Python floats and rejects float32 arrays
+        vectors = np.asarray(embeddings, dtype=np.float32).tolist()
+        
+        points = []
+        for (document_id, i, chunk_text), vector in zip(items, vectors):
+            chunk_id = self._chunk_uuid(document_id, i, chunk_text)
+            
+            # Only chunk-specific fields; document-level metadata lives in the
+            # registry and is joined back in by _chunk_metadata
+            chunk_metadata = {
+                "document_id": document_id,
+                "chunk_index": i,
+                "content_preview": chunk_text[:100] + "..." if len(chunk_text) > 100 else chunk_text,
+                "chunk_length": len(chunk_text)
+            }
+            
+            points.append(PointStruct(
+                id=chunk_id,
+                vector=vector,
+                payload={
+                    "content": chunk_text,
+                    "metadata": chunk_metadata
+                }
+            ))
+        return points
+    
+    def _registry_entry(self, doc_info: DocumentInfo, chunk_count: int) -> Dict[str, Any]:
+        """Registry record for a stored document"""
+        return {
+            "id": doc_info.id,
+            "filename": doc_info.filename,
+            "file_type": doc_info.file_type,
+            "file_size": doc_info.file_size,
+            "text_length": len(doc_info.content),
+            "upload_time": doc_info.upload_time.isoformat(),
+            "tags": doc_info.tags if doc_info.tags else [],
+            "context": doc_info.context,
+            "category": doc_info.category,
+            "related_documents": doc_info.related_documents if doc_info.related_documents else [],
+            "chunk_count": chunk_count
+        }
+    
+    def _chunk_metadata(self, payload_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Chunk payload metadata joined with its document's registry fields"""
+        doc = self.documents.get(payload_metadata.get("document_id"), {})
+        metadata = {key: doc[key] for key in self.DOCUMENT_METADATA_FIELDS if key in doc}
+        # Points stored before the split still carry the full metadata
+        metadata.update(payload_metadata)
+        return metadata
+    
+    async def store_documents_bulk(self, docs: List[DocumentInfo]) -> int:
+        """Store many documents at once; returns how many were stored.
+        
+        Chunks of all documents share the length-sorted encode/upload
+        pipeline, and HNSW indexing is paused while the points load, so the
+        graph is built once at the end instead of being updated on every
+        upsert.
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        if self.mode == "local":
+            stored = 0
+            for doc_info in docs:
+                stored += await self.store_document(doc_info)
+            return stored
+        
+        from qdrant_client.models import OptimizersConfigDiff
+        
+        try:
+            logger.info(f"📚 Bulk storing {len(docs)} documents")
+            doc_chunks = [self._chunk_text(doc_info.content) for doc_info in docs]
+            
+            await self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+            )
+            try:
+                stored = await self._embed_and_upsert(
+                    [(doc_info.id, chunks) for doc_info, chunks in zip(docs, doc_chunks)]
+                )
+                for doc_info, chunks in zip(docs, doc_chunks):
+                    self.documents[doc_info.id] = self._registry_entry(doc_info, len(chunks))
+            finally:
+                # Restore Qdrant's default threshold so indexing catches up
+                await self.client.update_collection(
+                    collection_name=self.collection_name,
+                    optimizers_config=OptimizersConfigDiff(indexing_threshold=20000)
+                )
+                self._save_documents_registry()
+            
+            logger.info(f"✅ Bulk stored {stored} chunks for {len(docs)} documents")
+            return len(docs)
+            
+        except Exception as e:
+            logger.error(f"Bulk document storage failed: {e}")
+            return 0
+    
     def list_documents(self) -> List[Dict[str, Any]]:
         """List all stored documents"""
         return list(self.documents.values())
     
-    async def search_documents(self, query: str, limit: int = 5, score_threshold: float = 0.3) -> List[SearchResult]:
-        """Search for relevant document chunks"""
+    async def _embed_query(self, query: str) -> np.ndarray:
+        """Embed a search query through a small exact-match LRU"""
+        key = " ".join(query.lower().split())
+        embedding = self._query_cache.get(key)
+        if embedding is not None:
+            self._query_cache.move_to_end(key)
+            return embedding
+        
+        embedding = await run_in_thread(self._generate_embedding, query)
+        self._query_cache[key] = embedding
+        if len(self._query_cache) > self.QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+    
+    def _search_local(self, query: str, limit: int, score_threshold: float) -> List[SearchResult]:
+        """Keyword search over the local chunk database"""
+        q = set(self._tokenize(query))
+        if not q:
+            return []
+        db = self._local_reader()
+        
+        if self._fts_available:
+            # BM25-ranked candidates from any query token
+            rows = db.execute(
+                "SELECT c.doc_id, c.chunk_id, c.content, c.metadata, c.tokens"
+                " FROM (SELECT doc_id, idx, rank FROM chunks_fts WHERE chunks_fts MATCH ?"
+                "       ORDER BY rank LIMIT ?) AS f"
+                " JOIN chunks AS c ON c.doc_id = f.doc_id AND c.idx = f.idx"
+                " ORDER BY f.rank",
+                (" OR ".join(f'"{token}"' for token in q), max(limit * 20, 200))
+            ).fetchall()
+        else:
+            rows = db.execute("SELECT doc_id, chunk_id, content, metadata, tokens FROM chunks").fetchall()
+        
+        # Score stays the fraction of query tokens in the chunk, so
+        # score_threshold keeps its meaning; BM25 order breaks ties
+        results: List[SearchResult] = []
+        for doc_id, chunk_id, content, metadata, tokens in rows:
+            # Tokens stored at write time; rows from before that are tokenized
+            chunk_tokens = tokens.split() if tokens is not None else _token_set(content)
+            score = len(q.intersection(chunk_tokens)) / len(q)
+            if score < score_threshold:
+                continue
+            md = _loads_json(metadata)
+            results.append(
+                SearchResult(
+                    document_id=md.get("document_id", doc_id),
+                    chunk_id=chunk_id,
+                    content=content,
+                    score=float(score),
+                    metadata=md,
+                )
+            )
+        results.sort(key=lambda r: r.score, reverse=True)
+        return results[:limit]
+    
+    def _search_local_dense(self, query_embedding: np.ndarray, limit: int,
+                            score_threshold: float) -> List[SearchResult]:
+        """Cosine search over the local chunk embeddings with one matrix-vector product"""
+        matrix, keys = self._local_embedding_matrix()
+        if not keys or limit <= 0:
+            return []
+        
+        scores = _cosine_scores(matrix, query_embedding.astype(np.float32))
+        k = min(limit, len(keys))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        db = self._local_reader()
+        results: List[SearchResult] = []
+        for i in top:
+            score = float(scores[i])
+            if score < score_threshold:
+                break
+            doc_id, idx = keys[i]
+            row = db.execute(
+                "SELECT chunk_id, content, metadata FROM chunks WHERE doc_id = ? AND idx = ?",
+                (doc_id, idx)
+            ).fetchone()
+            if row is None:
+                continue
+            chunk_id, content, metadata = row
+            md = _loads_json(metadata)
+            results.append(
+                SearchResult(
+                    document_id=md.get("document_id", doc_id),
+                    chunk_id=chunk_id,
+                    content=content,
+                    score=score,
+                    metadata=md,
+                )
+            )
+        return results
+    
+    async def search_documents(self, query: str, limit: int = 5, score_threshold: float = 0.3,
+                               hnsw_ef: Optional[int] = None) -> List[SearchResult]:
+        """Search for relevant document chunks
+        
+        hnsw_ef sets how many graph candidates Qdrant explores; by default it
+        scales with limit, since search cost grows roughly linearly with it.
+        """
         if not self.is_initialized:
             await self.initialize()
         
@@ -374,54 +1202,45 @@ class VectorStore:
             logger.info(f"🔍 Searching for: {query}")
 
             if self.mode == "local":
-                results: List[SearchResult] = []
-                for doc_id, doc_meta in self.documents.items():
-                    chunks_path = self._local_chunks_path(doc_id)
-                    if not os.path.exists(chunks_path):
-                        continue
-                    try:
-                        with open(chunks_path, "r") as f:
-                            chunks = json.load(f)
-                    except Exception:
-                        continue
-                    for ch in chunks:
-                        score = self._local_score(query, ch.get("content", ""))
-                        if score < score_threshold:
-                            continue
-                        md = ch.get("metadata") or {}
-                        results.append(
-                            SearchResult(
-                                document_id=md.get("document_id", doc_id),
-                                chunk_id=ch.get("chunk_id", ""),
-                                content=ch.get("content", ""),
-                                score=float(score),
-                                metadata=md,
-                            )
-                        )
-
-                results.sort(key=lambda r: r.score, reverse=True)
-                return results[:limit]
-            
-            # Generate query embedding
-            query_embedding = self._generate_embedding(query)
-            
-            # Search in Qdrant
-            search_results = self.client.search(
+                # Query and scoring run on a worker thread, off the event loop
+                if self.local_embeddings:
+                    query_embedding = await self._embed_query(query)
+                    return await run_in_thread(
+                        self._search_local_dense, query_embedding, limit, score_threshold
+                    )
+                return await run_in_thread(self._search_local, query, limit, score_threshold)
+            
+            from qdrant_client.models import SearchParams, QuantizationSearchParams
+            
+            # Generate query embedding, reusing it for repeated queries
+            query_embedding = await self._embed_query(query)
+            
+            # Search in Qdrant: candidates from the int8 vectors, final
+            # scores from the original ones
+            response = await self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
+                query=query_embedding,
                 limit=limit,
-                score_threshold=score_threshold
+                score_threshold=score_threshold,
+                search_params=SearchParams(
+                    hnsw_ef=hnsw_ef or max(16, limit * 4),
+                    exact=False,
+                    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+                ),
+                # Only text and metadata are used; don't ship vectors back
+                with_payload=True,
+                with_vectors=False
             )
             
             # Convert to SearchResult objects
             results = []
-            for result in search_results:
+            for result in response.points:
                 search_result = SearchResult(
                     document_id=result.payload["metadata"]["document_id"],
                     chunk_id=result.id,
                     content=result.payload["content"],
                     score=result.score,
-                    metadata=result.payload["metadata"]
+                    metadata=self._chunk_metadata(result.payload["metadata"])
                 )
                 results.append(search_result)
             
@@ -432,6 +1251,19 @@ class VectorStore:
             logger.error(f"Search failed: {e}")
             return []
     
+    def _document_filter(self, document_id: str) -> Any:
+        """Qdrant filter matching every chunk of a document"""
+        from qdrant_client.models import Filter, FieldCondition, MatchValue
+        
+        return Filter(
+            must=[
+                FieldCondition(
+                    key="metadata.document_id",
+                    match=MatchValue(value=document_id)
+                )
+            ]
+        )
+    
     async def get_document_chunks(self, document_id: str) -> List[SearchResult]:
         """Get all chunks for a specific document"""
         if not self.is_initialized:
@@ -439,53 +1271,42 @@ class VectorStore:
         
         try:
             if self.mode == "local":
-                chunks_path = self._local_chunks_path(document_id)
-                if not os.path.exists(chunks_path):
-                    return []
-                with open(chunks_path, "r") as f:
-                    chunks = json.load(f)
-                results = [
+                return [
                     SearchResult(
                         document_id=document_id,
-                        chunk_id=ch.get("chunk_id", ""),
-                        content=ch.get("content", ""),
+                        chunk_id=chunk_id,
+                        content=content,
                         score=1.0,
-                        metadata=ch.get("metadata") or {},
+                        metadata=md,
                     )
-                    for ch in chunks
+                    for _, chunk_id, content, md in self._read_local_chunks(document_id)
                 ]
-                results.sort(key=lambda x: x.metadata.get("chunk_index", 0))
-                return results
 
-            # Search with filter for specific document
-            from qdrant_client.models import Filter, FieldCondition, MatchValue
-            
-            filter_condition = Filter(
-                must=[
-                    FieldCondition(
-                        key="metadata.document_id",
-                        match=MatchValue(value=document_id)
-                    )
-                ]
-            )
-            
-            search_results = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=filter_condition,
-                limit=100
-            )
-            
-            # Convert to SearchResult objects
+            # Page through every chunk of the document
             results = []
-            for result in search_results[0]:  # scroll returns (points, next_page_offset)
-                search_result = SearchResult(
-                    document_id=result.payload["metadata"]["document_id"],
-                    chunk_id=result.id,
-                    content=result.payload["content"],
-                    score=1.0,  # No scoring for direct retrieval
-                    metadata=result.payload["metadata"]
+            next_offset = None
+            while True:
+                points, next_offset = await self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=self._document_filter(document_id),
+                    limit=1024,
+                    offset=next_offset,
+                    with_payload=True,
+                    with_vectors=False
                 )
-                results.append(search_result)
+                
+                # Convert to SearchResult objects
+                for result in points:
+                    results.append(SearchResult(
+                        document_id=result.payload["metadata"]["document_id"],
+                        chunk_id=result.id,
+                        content=result.payload["content"],
+                        score=1.0,  # No scoring for direct retrieval
+                        metadata=self._chunk_metadata(result.payload["metadata"])
+                    ))
+                
+                if next_offset is None:
+                    break
             
             # Sort by chunk index
             results.sort(key=lambda x: x.metadata.get("chunk_index", 0))
@@ -503,30 +1324,23 @@ class VectorStore:
         
         try:
             if self.mode == "local":
-                try:
-                    chunks_path = self._local_chunks_path(document_id)
-                    if os.path.exists(chunks_path):
-                        os.remove(chunks_path)
-                except Exception:
-                    pass
+                with self._db:
+                    self._delete_local_chunks(document_id)
+                self._invalidate_local_matrix()
 
                 if document_id in self.documents:
                     del self.documents[document_id]
                     self._save_documents_registry()
                 return True
 
-            # Get all chunk IDs for the document
-            chunks = await self.get_document_chunks(document_id)
-            chunk_ids = [chunk.chunk_id for chunk in chunks]
+            # Delete every chunk of the document server-side by filter
+            from qdrant_client.models import FilterSelector
             
-            if chunk_ids:
-                # Delete from Qdrant
-                self.client.delete(
-                    collection_name=self.collection_name,
-                    points_selector=chunk_ids
-                )
-                
-                logger.info(f"🗑️ Deleted {len(chunk_ids)} chunks for document: {document_id}")
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=self._document_filter(document_id))
+            )
+            logger.info(f"🗑️ Deleted chunks for document: {document_id}")
             
             # Remove from registry
             if document_id in self.documents:
@@ -555,7 +1369,7 @@ class VectorStore:
                     "mode": "local",
                 }
 
-            collection_info = self.client.get_collection(self.collection_name)
+            collection_info = await self.client.get_collection(self.collection_name)
             
             return {
                 "total_chunks": collection_info.points_count,
@@ -572,6 +1386,11 @@ class VectorStore:
 # Global vector store instance
 _vector_store = None
 
+async def flush_vector_store():
+    """Persist pending writes of the global vector store, if one exists"""
+    if _vector_store is not None:
+        await _vector_store.flush()
+
 async def get_vector_store() -> VectorStore:
     """Get or create the global vector store"""
     global _vector_store
@@ -7,14 +7,109 @@ import asyncio
 import logging
 import json
 import os
-from typing import Dict, List, Optional, Any
+import re
+import time
+import hashlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
-import requests
+import aiohttp
+import numpy as np
 from ..audio.processor import AudioProcessingResult
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Static instructions go in Ollama's system field: identical across requests,
+# so the server can reuse their evaluated prefix instead of re-processing
+# them, and each prompt carries only the statement and its context
+FACT_CHECK_SYSTEM_PROMPT = """You are a brutally honest fact-checking AI. You ALWAYS start your responses with "Let me be brutally honest..." and then tell the unvarnished truth without sugar-coating anything.
+
+You will be given COMPANY KNOWLEDGE and a STATEMENT TO CHECK.
+
+Analyze the statement and respond in JSON format, but make your "brutal_response" field conversational and direct:
+{
+    "brutal_response": "Let me be brutally honest... [your direct, honest assessment]",
+    "is_accurate": true/false,
+    "confidence": 0.0-1.0,
+    "issues": ["list of factual issues found"],
+    "corrections": ["list of corrections needed"],
+    "sources": ["relevant knowledge base sections"],
+    "honesty_level": "brutal"
+}
+
+Your brutal_response should:
+1. Start with "Let me be brutally honest..."
+2. Point out exactly what's wrong or questionable
+3. Be direct but not insulting
+4. Highlight gaps in reasoning or evidence
+5. Call out assumptions or oversimplifications
+
+Examples of brutal honesty:
+- "Let me be brutally honest... that statement sounds confident but lacks any supporting evidence."
+- "Let me be brutally honest... you're making assumptions that aren't backed by the data we have."
+- "Let me be brutally honest... while technically correct, you're missing the bigger picture here."
+"""
+
+FEEDBACK_SYSTEM_PROMPT = """You are a communication coach providing feedback on spoken statements.
+
+You will be given a TRANSCRIPT with its number of SPEAKERS and DURATION.
+
+Provide constructive feedback in JSON format:
+{
+    "summary": "brief summary of the statement",
+    "suggestions": ["list of improvement suggestions"],
+    "accuracy_score": 0.0-1.0,
+    "process_alignment": 0.0-1.0,
+    "key_points": ["main points identified"]
+}
+
+Focus on:
+1. Clarity and coherence
+2. Completeness of information
+3. Professional communication
+4. Areas for improvement
+"""
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_JSON_DECODER = json.JSONDecoder()
+
+def _loose_json(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object embedded in LLM output, or None
+    
+    Decodes from each '{' in turn with the stdlib decoder, which stops at the
+    end of the object and so ignores trailing text. Only if that fails is
+    the much slower json5 tried, for trailing commas and similar.
+    """
+    start = text.find("{")
+    first = start
+    for _ in range(8):
+        if start < 0:
+            break
+        try:
+            data, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    
+    end = text.rfind("}")
+    if first < 0 or end < first:
+        return None
+    try:
+        import json5
+        data = json5.loads(text[first:end + 1])
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
 @dataclass
 class FactCheckResult:
     """Result of fact-checking analysis"""
@@ -41,16 +136,133 @@ class AnalysisResult:
     timestamp: datetime
     confidence: float
 
+class _JsonObjectTracker:
+    """Tells when streamed text has completed its first top-level JSON object"""
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> bool:
+        """Consume the next piece of text; True once the object has closed"""
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+            elif ch == '"' and self.depth > 0:
+                # Quotes in prose before the object don't start strings
+                self.in_string = True
+        return False
+
+class _SemanticCache:
+    """Recent (prompt embedding, response) pairs, looked up by cosine similarity
+    
+    Embeddings sit in one preallocated float32 matrix so a lookup is a single
+    matrix-vector product. Entries expire ttl seconds after insertion, hits
+    or not; when full, an expired or else the least recently used slot is
+    overwritten.
+    """
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._matrix: Optional[np.ndarray] = None
+        self._responses: List[Optional[str]] = [None] * max_size
+        self._inserted_at = np.full(max_size, -np.inf)
+        self._last_used = np.full(max_size, -np.inf)
+    
+    def lookup(self, embedding: np.ndarray, threshold: float) -> Optional[str]:
+        if self._matrix is None:
+            return None
+        now = time.monotonic()
+        scores = self._matrix @ embedding
+        # Empty and expired slots never match
+        scores[now - self._inserted_at > self.ttl] = -1.0
+        i = int(np.argmax(scores))
+        if scores[i] < threshold:
+            return None
+        self._last_used[i] = now
+        return self._responses[i]
+    
+    def insert(self, embedding: np.ndarray, response: str):
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_size, embedding.shape[0]), dtype=np.float32)
+        now = time.monotonic()
+        expired = now - self._inserted_at > self.ttl
+        i = int(np.argmin(np.where(expired, -np.inf, self._last_used)))
+        self._matrix[i] = embedding
+        self._responses[i] = response
+        self._inserted_at[i] = now
+        self._last_used[i] = now
+
 class LLMAnalyzer:
     """Local LLM analyzer using Ollama"""
     
+    EXACT_CACHE_SIZE = 2048
+    SEMANTIC_CACHE_SIZE = 512
+    SEMANTIC_CACHE_TTL = 3600.0
+    
     def __init__(self):
         self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
         self.model_name = os.getenv("LLM_MODEL", "mistral:7b")
         self.is_initialized = False
+        # One keep-alive connection pool for all Ollama calls, see _get_session
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Responses to byte-identical prompts (after whitespace normalization), LRU
+        self._exact_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        # Generations sent to Ollama at once. Ollama batches up to
+        # OLLAMA_NUM_PARALLEL concurrent requests into one forward pass; more
+        # would just queue server-side, where the wait eats the request timeout
+        self._generate_semaphore = asyncio.Semaphore(
+            int(os.getenv("LLM_MAX_CONCURRENCY") or os.getenv("OLLAMA_NUM_PARALLEL") or 4)
+        )
+        # Generations in progress by prompt key; identical concurrent
+        # requests wait for the first one instead of running again
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        
+        # Reuse responses for near-duplicate statements. Opt-in: a fact-check
+        # cached for a similar statement can be wrong for this one.
+        self.semantic_cache_enabled = os.getenv("LLM_SEMANTIC_CACHE", "").strip().lower() in ("1", "true", "yes")
+        self.semantic_cache_threshold = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.embed_model_name = os.getenv("LLM_EMBED_MODEL", "nomic-embed-text")
+        # Separate caches per (model, prompt kind) keep each matrix small
+        self._sem_cache: Dict[Tuple[str, str], _SemanticCache] = {}
         
         # Company knowledge base (this would be loaded from your vector DB)
         self.knowledge_base = self._load_knowledge_base()
+        # keyword -> indexes of knowledge base docs listing it
+        self._kw_to_docs: Dict[str, List[int]] = defaultdict(list)
+        for i, doc in enumerate(self.knowledge_base):
+            for keyword in doc.get("keywords", []):
+                self._kw_to_docs[keyword.lower()].append(i)
+        # All keywords in one automaton: a single pass over the transcript
+        # finds every match, multi-word keywords included
+        self._kw_automaton = None
+        if AHOCORASICK_AVAILABLE and self._kw_to_docs:
+            self._kw_automaton = ahocorasick.Automaton()
+            for keyword, doc_ids in self._kw_to_docs.items():
+                self._kw_automaton.add_word(keyword, (len(keyword), doc_ids))
+            self._kw_automaton.make_automaton()
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session, so concurrent analyses reuse pooled connections"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=32, keepalive_timeout=60)
+            )
+        return self._session
     
     async def initialize(self) -> bool:
         """Initialize LLM connection"""
@@ -58,23 +270,25 @@ class LLMAnalyzer:
             logger.info("Initializing LLM analyzer...")
             
             # Check if Ollama is running
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [model["name"] for model in models]
-                
-                if self.model_name in model_names:
-                    logger.info(f"LLM model {self.model_name} is available")
-                    self.is_initialized = True
-                    return True
-                else:
-                    logger.warning(f"Model {self.model_name} not found. Available models: {model_names}")
-                    # Try to pull the model
-                    await self._pull_model()
-                    return True
+            session = self._get_session()
+            async with session.get(f"{self.ollama_url}/api/tags", timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                if resp.status != 200:
+                    logger.error(f"Ollama not accessible at {self.ollama_url}")
+                    return False
+                data = await resp.json()
+            
+            models = data.get("models", [])
+            model_names = [model["name"] for model in models]
+            
+            if self.model_name in model_names:
+                logger.info(f"LLM model {self.model_name} is available")
+                self.is_initialized = True
+                return True
             else:
-                logger.error(f"Ollama not accessible at {self.ollama_url}")
-                return False
+                logger.warning(f"Model {self.model_name} not found. Available models: {model_names}")
+                # Try to pull the model
+                await self._pull_model()
+                return True
                 
         except Exception as e:
             logger.error(f"Failed to initialize LLM analyzer: {e}")
@@ -86,16 +300,18 @@ class LLMAnalyzer:
         """Pull the specified model if not available"""
         try:
             logger.info(f"Pulling model {self.model_name}...")
-            response = requests.post(
+            async with self._get_session().post(
                 f"{self.ollama_url}/api/pull",
                 json={"name": self.model_name},
-                timeout=300  # 5 minutes timeout for model download
-            )
-            if response.status_code == 200:
-                logger.info(f"Model {self.model_name} pulled successfully")
-                self.is_initialized = True
-            else:
-                logger.error(f"Failed to pull model: {response.text}")
+                timeout=aiohttp.ClientTimeout(total=300)  # 5 minutes timeout for model download
+            ) as resp:
+                # The pull streams progress until the download finishes
+                body = await resp.text()
+                if resp.status == 200:
+                    logger.info(f"Model {self.model_name} pulled successfully")
+                    self.is_initialized = True
+                else:
+                    logger.error(f"Failed to pull model: {body}")
         except Exception as e:
             logger.error(f"Error pulling model: {e}")
     
@@ -108,11 +324,18 @@ class LLMAnalyzer:
         try:
             logger.info("Analyzing transcript with LLM...")
             
-            # Perform fact-checking
-            fact_check = await self._fact_check_transcript(audio_result.transcript)
-            
-            # Generate feedback
-            feedback = await self._generate_feedback(audio_result)
+            # Fact-check and feedback are independent LLM calls; run them side by side
+            fact_check, feedback = await asyncio.gather(
+                self._fact_check_transcript(audio_result.transcript),
+                self._generate_feedback(audio_result),
+                return_exceptions=True
+            )
+            if isinstance(fact_check, BaseException):
+                logger.error(f"Fact-checking error: {fact_check}")
+                fact_check = self._create_fallback_fact_check()
+            if isinstance(feedback, BaseException):
+                logger.error(f"Feedback generation error: {feedback}")
+                feedback = self._create_fallback_feedback()
             
             # Calculate overall confidence
             overall_confidence = (fact_check.confidence + audio_result.confidence) / 2
@@ -142,7 +365,9 @@ class LLMAnalyzer:
             prompt = self._create_fact_check_prompt(transcript, relevant_context)
             
             # Query LLM
-            response = await self._query_llm(prompt)
+            response = await self._query_llm(
+                prompt, system=FACT_CHECK_SYSTEM_PROMPT, kind="fact_check", cache_text=transcript
+            )
             
             # Parse response
             return self._parse_fact_check_response(response)
@@ -161,7 +386,9 @@ class LLMAnalyzer:
             prompt = self._create_feedback_prompt(audio_result)
             
             # Query LLM
-            response = await self._query_llm(prompt)
+            response = await self._query_llm(
+                prompt, system=FEEDBACK_SYSTEM_PROMPT, kind="feedback", cache_text=audio_result.transcript
+            )
             
             # Parse response
             return self._parse_feedback_response(response)
@@ -170,95 +397,179 @@ class LLMAnalyzer:
             logger.error(f"Feedback generation error: {e}")
             return self._create_fallback_feedback()
     
-    async def _query_llm(self, prompt: str) -> str:
-        """Query local LLM via Ollama"""
+    async def _query_llm(self, prompt: str, system: Optional[str] = None, kind: str = "generic",
+                         cache_text: Optional[str] = None, no_cache: bool = False) -> str:
+        """Query local LLM, answering near-duplicate requests from the semantic cache
+        
+        cache_text is what gets compared for similarity (defaults to the whole
+        prompt); pass no_cache=True for prompts that must not be cached.
+        """
+        if no_cache:
+            return await self._generate(prompt, system)
+        
+        key = self._prompt_key(prompt, system)
+        while True:
+            response = self._exact_cache.get(key)
+            if response is not None:
+                self._exact_cache.move_to_end(key)
+                return response
+            
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                # shield: a cancelled follower must not cancel the shared request
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The leading caller was cancelled, not this one: try again,
+                # leading a new generation if nobody else has
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._query_uncached(prompt, system, key, kind, cache_text)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Followers re-raise it; retrieve it so a lone request doesn't warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+    
+    async def _query_uncached(self, prompt: str, system: Optional[str], key: bytes, kind: str,
+                              cache_text: Optional[str]) -> str:
+        """Semantic cache lookup, then generation; fills both caches"""
+        cache = None
+        embedding = None
+        if self.semantic_cache_enabled:
+            embedding = await self._embed_text(cache_text if cache_text is not None else prompt)
+            if embedding is not None:
+                cache = self._sem_cache.get((self.model_name, kind))
+                if cache is None:
+                    cache = _SemanticCache(self.SEMANTIC_CACHE_SIZE, self.SEMANTIC_CACHE_TTL)
+                    self._sem_cache[(self.model_name, kind)] = cache
+                cached = cache.lookup(embedding, self.semantic_cache_threshold)
+                if cached is not None:
+                    logger.info(f"♻️ Semantic cache hit ({kind})")
+                    return cached
+        
+        response = await self._generate(prompt, system)
+        if response:
+            self._exact_cache[key] = response
+            if len(self._exact_cache) > self.EXACT_CACHE_SIZE:
+                self._exact_cache.popitem(last=False)
+            if cache is not None:
+                cache.insert(embedding, response)
+        return response
+    
+    def _prompt_key(self, prompt: str, system: Optional[str] = None) -> bytes:
+        """Exact-cache key: model, system prompt and prompt, with whitespace runs collapsed"""
+        normalized = " ".join(prompt.split())
+        return hashlib.blake2b(
+            f"{self.model_name}\0{system or ''}\0{normalized}".encode("utf-8"), digest_size=16
+        ).digest()
+    
+    async def _embed_text(self, text: str) -> Optional[np.ndarray]:
+        """Normalized Ollama embedding of text, or None when unavailable"""
+        try:
+            async with self._get_session().post(
+                f"{self.ollama_url}/api/embeddings",
+                json={"model": self.embed_model_name, "prompt": text},
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as resp:
+                if resp.status == 404:
+                    # Embedding model not pulled; retrying won't help
+                    logger.warning(f"Semantic cache disabled: {await resp.text()}")
+                    self.semantic_cache_enabled = False
+                    return None
+                if resp.status != 200:
+                    raise RuntimeError(await resp.text())
+                data = await resp.json()
+            embedding = np.asarray(data["embedding"], dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            return embedding / norm if norm > 0 else None
+        except Exception as e:
+            # Transient (timeout, server busy): skip the cache for this call only
+            logger.warning(f"Semantic cache lookup skipped, embedding failed: {e}")
+            return None
+    
+    async def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        """Query local LLM via Ollama
+        
+        The answer is streamed and the read stops as soon as its JSON object
+        is complete, skipping whatever the model would generate after it.
+        """
         try:
             payload = {
                 "model": self.model_name,
                 "prompt": prompt,
-                "stream": False,
+                "stream": True,
                 "options": {
                     "temperature": 0.3,  # Lower temperature for more consistent results
                     "top_p": 0.9,
                     "max_tokens": 1000
                 }
             }
+            if system:
+                payload["system"] = system
             
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                logger.error(f"LLM query failed: {response.text}")
-                return ""
+            # Waiting here doesn't count against the HTTP timeout
+            async with self._generate_semaphore:
+                async with self._get_session().post(
+                    f"{self.ollama_url}/api/generate",
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=30)
+                ) as resp:
+                    if resp.status != 200:
+                        logger.error(f"LLM query failed: {await resp.text()}")
+                        return ""
+                    
+                    # One JSON chunk per line: {"response": "...", "done": false}
+                    parts = []
+                    tracker = _JsonObjectTracker()
+                    async for line in resp.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        text = chunk.get("response", "")
+                        parts.append(text)
+                        if chunk.get("done"):
+                            break
+                        if tracker.feed(text):
+                            if _loose_json("".join(parts)) is None:
+                                # Braces in prose fooled the tracker; keep reading
+                                tracker = _JsonObjectTracker()
+                                continue
+                            # Drop the connection rather than drain the rest of the generation
+                            resp.close()
+                            break
+                    return "".join(parts)
                 
         except Exception as e:
             logger.error(f"LLM query error: {e}")
             return ""
     
     def _create_fact_check_prompt(self, transcript: str, context: str) -> str:
-        """Create prompt for brutally honest fact-checking"""
-        return f"""
-You are a brutally honest fact-checking AI. You ALWAYS start your responses with "Let me be brutally honest..." and then tell the unvarnished truth without sugar-coating anything.
-
-COMPANY KNOWLEDGE:
+        """Create prompt for brutally honest fact-checking (instructions are in FACT_CHECK_SYSTEM_PROMPT)"""
+        return f"""COMPANY KNOWLEDGE:
 {context}
 
 STATEMENT TO CHECK:
 "{transcript}"
-
-Analyze this statement and respond in JSON format, but make your "brutal_response" field conversational and direct:
-{{
-    "brutal_response": "Let me be brutally honest... [your direct, honest assessment]",
-    "is_accurate": true/false,
-    "confidence": 0.0-1.0,
-    "issues": ["list of factual issues found"],
-    "corrections": ["list of corrections needed"],
-    "sources": ["relevant knowledge base sections"],
-    "honesty_level": "brutal"
-}}
-
-Your brutal_response should:
-1. Start with "Let me be brutally honest..."
-2. Point out exactly what's wrong or questionable
-3. Be direct but not insulting
-4. Highlight gaps in reasoning or evidence
-5. Call out assumptions or oversimplifications
-
-Examples of brutal honesty:
-- "Let me be brutally honest... that statement sounds confident but lacks any supporting evidence."
-- "Let me be brutally honest... you're making assumptions that aren't backed by the data we have."
-- "Let me be brutally honest... while technically correct, you're missing the bigger picture here."
 """
     
     def _create_feedback_prompt(self, audio_result: AudioProcessingResult) -> str:
-        """Create prompt for feedback generation"""
-        return f"""
-You are a communication coach providing feedback on spoken statements.
-
-TRANSCRIPT: "{audio_result.transcript}"
+        """Create prompt for feedback generation (instructions are in FEEDBACK_SYSTEM_PROMPT)"""
+        return f"""TRANSCRIPT: "{audio_result.transcript}"
 SPEAKERS: {len(audio_result.speakers)} speaker(s)
 DURATION: {audio_result.audio_duration:.1f} seconds
-
-Provide constructive feedback in JSON format:
-{{
-    "summary": "brief summary of the statement",
-    "suggestions": ["list of improvement suggestions"],
-    "accuracy_score": 0.0-1.0,
-    "process_alignment": 0.0-1.0,
-    "key_points": ["main points identified"]
-}}
-
-Focus on:
-1. Clarity and coherence
-2. Completeness of information
-3. Professional communication
-4. Areas for improvement
 """
     
     def _get_relevant_context(self, transcript: str) -> str:
@@ -266,26 +577,31 @@ Focus on:
         # This is a simplified version. In production, you'd use vector search
         # with Qdrant or similar to find relevant documents
         
-        relevant_docs = []
+        # Simple keyword matching (replace with semantic search)
         transcript_lower = transcript.lower()
+        hits = set()
+        if self._kw_automaton is not None:
+            for end, (length, doc_ids) in self._kw_automaton.iter(transcript_lower):
+                # Whole words only, like the token lookup below
+                start = end - length + 1
+                if (start > 0 and transcript_lower[start - 1].isalnum()) or \
+                        (end + 1 < len(transcript_lower) and transcript_lower[end + 1].isalnum()):
+                    continue
+                hits.update(doc_ids)
+        else:
+            # Look up each distinct transcript word in the keyword index
+            for token in set(_TOKEN_RE.findall(transcript_lower)):
+                hits.update(self._kw_to_docs.get(token, ()))
         
-        for doc in self.knowledge_base:
-            # Simple keyword matching (replace with semantic search)
-            if any(keyword in transcript_lower for keyword in doc.get("keywords", [])):
-                relevant_docs.append(doc["content"])
-        
-        return "\n\n".join(relevant_docs[:3])  # Limit to top 3 relevant docs
+        # Knowledge base order, limited to top 3 relevant docs
+        return "\n\n".join(self.knowledge_base[i]["content"] for i in sorted(hits)[:3])
     
     def _parse_fact_check_response(self, response: str) -> FactCheckResult:
         """Parse LLM response for brutally honest fact-checking"""
         try:
             # Try to extract JSON from response
-            if "{" in response and "}" in response:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                json_str = response[json_start:json_end]
-                data = json.loads(json_str)
-                
+            data = _loose_json(response)
+            if data is not None:
                 # Create a custom FactCheckResult that includes brutal honesty
                 result = FactCheckResult(
                     is_accurate=data.get("is_accurate", False),
@@ -312,12 +628,8 @@ Focus on:
         """Parse LLM response for feedback"""
         try:
             # Try to extract JSON from response
-            if "{" in response and "}" in response:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                json_str = response[json_start:json_end]
-                data = json.loads(json_str)
-                
+            data = _loose_json(response)
+            if data is not None:
                 return FeedbackResult(
                     summary=data.get("summary", "No summary available"),
                     suggestions=data.get("suggestions", []),
@@ -389,4 +701,7 @@ Focus on:
     async def cleanup(self):
         """Cleanup resources"""
         logger.info("Cleaning up LLM analyzer...")
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         self.is_initialized = False
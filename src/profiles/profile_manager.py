@@ -11,7 +11,7 @@ import uuid
 
 from documents.schemas import (
     ClientProfile, BrandProfile, PersonProfile,
-    Fact, create_fact
+    Fact, create_fact, to_json
 )
 
 logger = logging.getLogger(__name__)
@@ -335,8 +335,7 @@ class ProfileManager:
         if verified is not None:
             fact.verified = verified
         
-        fact.updated_at = datetime.now()
-        profile.updated_at = datetime.now()
+        fact.updated_at = profile.updated_at = datetime.now()
         
         await self._save_profile(profile, profile_type)
         logger.info(f"✅ Updated fact in {profile_type} profile: {profile.name}")
@@ -361,8 +360,8 @@ class ProfileManager:
         """Save a profile to JSON file"""
         file_path = self._get_profile_path(profile.id, profile_type)
         
-        with open(file_path, 'w') as f:
-            json.dump(profile.to_dict(), f, indent=2)
+        with open(file_path, 'wb') as f:
+            f.write(to_json(profile, indent=True))
     
     async def _load_profile(self, profile_id: str, profile_type: str):
         """Load a profile from JSON file"""
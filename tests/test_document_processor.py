@@ -0,0 +1,122 @@
+"""
+Document Processor Tests - format dispatch and text extraction
+"""
+
+import pytest
+import sys
+import os
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from documents.processor import DocumentProcessor
+
+
+@pytest.fixture
+def processor():
+    return DocumentProcessor()
+
+
+# ============================================
+# FORMAT DISPATCH TESTS
+# ============================================
+
+class TestFormatDispatch:
+    """Tests for file extension handling"""
+
+    @pytest.mark.unit
+    def test_supported_formats_match_extractors(self, processor):
+        """The public format list is the dispatch table's"""
+        assert processor.supported_formats == {'.txt', '.pdf', '.doc', '.docx'}
+        assert processor.supported_formats == set(processor._extractors)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("filename, expected", [
+        ("report.PDF", ".pdf"),
+        ("archive.tar.docx", ".docx"),
+        ("notes", ""),
+        (".txt", ""),
+        ("trailing.", ""),
+        ("release.v2/notes", ""),
+        ("release.v2/notes.txt", ".txt"),
+    ])
+    def test_file_extension(self, filename, expected):
+        """Extensions follow Path.suffix, lower-cased"""
+        assert DocumentProcessor._get_file_extension(filename) == expected
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_unsupported_format_rejected(self, processor):
+        """Files without an extractor raise ValueError"""
+        with pytest.raises(ValueError, match="Unsupported file format: .xlsx"):
+            await processor.process_document(b"data", "sheet.xlsx")
+
+
+# ============================================
+# TEXT EXTRACTION TESTS
+# ============================================
+
+class TestTextExtraction:
+    """Tests for plain text documents"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_txt_document(self, processor):
+        """Text files are decoded and stripped"""
+        doc = await processor.process_document("  Vergadering over coördinatie \n".encode(), "Notes.TXT")
+
+        assert doc.content == "Vergadering over coördinatie"
+        assert doc.file_type == ".txt"
+        assert doc.id == f"doc_{doc.hash[:16]}"
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_identical_upload_uses_content_cache(self, processor, monkeypatch):
+        """Re-uploading the same bytes skips extraction"""
+        await processor.process_document(b"same text", "a.txt")
+
+        def fail(file_data):
+            raise AssertionError("extractor should not run")
+
+        monkeypatch.setitem(processor._extractors, ".txt", fail)
+        doc = await processor.process_document(b"same text", "b.txt")
+
+        assert doc.content == "same text"
+
+
+# ============================================
+# PDF WORKER POOL TESTS
+# ============================================
+
+class TestPdfWorkerPool:
+    """Tests for the large-PDF worker processes"""
+
+    @pytest.mark.unit
+    def test_worker_count_capped(self, monkeypatch):
+        """Workers default to the core count, capped at PDF_MAX_WORKERS"""
+        monkeypatch.delenv("BH_PDF_WORKERS", raising=False)
+        monkeypatch.setattr(os, "cpu_count", lambda: 64)
+        assert DocumentProcessor()._pdf_workers == DocumentProcessor.PDF_MAX_WORKERS
+
+    @pytest.mark.unit
+    def test_worker_count_from_env(self, monkeypatch):
+        """BH_PDF_WORKERS overrides the default"""
+        monkeypatch.setenv("BH_PDF_WORKERS", "1")
+        assert DocumentProcessor()._pdf_workers == 1
+
+    @pytest.mark.unit
+    @pytest.mark.slow
+    def test_pool_not_forked_and_shut_down(self, processor):
+        """Workers start without fork and stop on shutdown"""
+        pool = processor._get_pdf_pool()
+        try:
+            assert processor._get_pdf_pool() is pool
+            assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+            assert pool.submit(os.getpid).result(timeout=60) != os.getpid()
+        finally:
+            processor.shutdown()
+
+        assert processor._pdf_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(os.getpid)
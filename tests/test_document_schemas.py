@@ -0,0 +1,51 @@
+"""
+Document Schema Tests - ID generation
+"""
+
+import pytest
+import sys
+import os
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from documents import schemas
+
+
+# ============================================
+# FAST ID TESTS
+# ============================================
+
+class TestFastId:
+    """Tests for pooled random IDs"""
+
+    @pytest.mark.unit
+    def test_shape_and_uniqueness(self):
+        """IDs are 32 hex characters and don't repeat across pool refills"""
+        ids = [schemas._fast_id() for _ in range(3 * schemas._ID_POOL_SIZE)]
+
+        assert all(len(i) == 32 for i in ids)
+        assert all(int(i, 16) >= 0 for i in ids)
+        assert len(set(ids)) == len(ids)
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+    def test_forked_child_gets_fresh_ids(self):
+        """A forked child doesn't hand out the parent's pooled IDs"""
+        schemas._fast_id()  # make sure the parent has a partly used pool
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.write(write_fd, "".join(schemas._fast_id() for _ in range(4)).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            child = pipe.read()
+        os.waitpid(pid, 0)
+
+        child_ids = {child[i:i + 32] for i in range(0, len(child), 32)}
+        parent_ids = {schemas._fast_id() for _ in range(4)}
+        assert len(child_ids) == 4
+        assert not child_ids & parent_ids
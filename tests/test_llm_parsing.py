@@ -0,0 +1,104 @@
+"""
+LLM Output Parsing Tests - JSON extraction from model responses
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add repo root to path (the analyzer uses package-relative imports)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+analyzer = pytest.importorskip("src.llm.analyzer")
+
+
+# ============================================
+# LOOSE JSON TESTS
+# ============================================
+
+class TestLooseJson:
+    """Tests for extracting the first JSON object from LLM output"""
+
+    @pytest.mark.unit
+    def test_plain_object(self):
+        """A bare JSON object is decoded as-is"""
+        assert analyzer._loose_json('{"score": 3}') == {"score": 3}
+
+    @pytest.mark.unit
+    def test_prose_before_object(self):
+        """Text before the object is skipped"""
+        text = 'Sure! Here is the analysis:\n{"credibility": 0.4, "issues": []}'
+        assert analyzer._loose_json(text) == {"credibility": 0.4, "issues": []}
+
+    @pytest.mark.unit
+    def test_trailing_text_ignored(self):
+        """Text after the object is ignored, even if it has braces"""
+        text = '{"summary": "ok"}\nLet me know if you need {anything} else.'
+        assert analyzer._loose_json(text) == {"summary": "ok"}
+
+    @pytest.mark.unit
+    def test_braces_inside_strings(self):
+        """Braces in string values don't end the object"""
+        text = 'Result: {"quote": "he said {not} this}", "n": 1}'
+        assert analyzer._loose_json(text) == {"quote": "he said {not} this}", "n": 1}
+
+    @pytest.mark.unit
+    def test_brace_in_prose_before_object(self):
+        """A stray brace in the preamble falls through to the real object"""
+        text = 'Format {like this}: {"a": 1}'
+        assert analyzer._loose_json(text) == {"a": 1}
+
+    @pytest.mark.unit
+    def test_no_json_returns_none(self):
+        """Output without an object gives None"""
+        assert analyzer._loose_json("I cannot analyze this transcript.") is None
+        assert analyzer._loose_json("") is None
+
+    @pytest.mark.unit
+    def test_top_level_array_returns_none(self):
+        """Only objects count, not arrays of scalars"""
+        assert analyzer._loose_json("[1, 2, 3]") is None
+
+
+# ============================================
+# STREAMED OBJECT TRACKER TESTS
+# ============================================
+
+class TestJsonObjectTracker:
+    """Tests for detecting the end of a streamed JSON object"""
+
+    @staticmethod
+    def feed_all(pieces):
+        tracker = analyzer._JsonObjectTracker()
+        return [tracker.feed(piece) for piece in pieces]
+
+    @pytest.mark.unit
+    def test_complete_in_one_piece(self):
+        """A whole object closes on the piece that contains it"""
+        assert self.feed_all(['{"a": {"b": 1}}']) == [True]
+
+    @pytest.mark.unit
+    def test_chunked_feed(self):
+        """Closes only on the piece with the final brace"""
+        pieces = ['Here: {"a"', ': {"b', '": 1}', ', "c": 2', "}", " trailing"]
+        assert self.feed_all(pieces) == [False, False, False, False, True, False]
+
+    @pytest.mark.unit
+    def test_braces_inside_strings(self):
+        """Braces in string values don't change the depth"""
+        assert self.feed_all(['{"text": "}}}{"', "}"]) == [False, True]
+
+    @pytest.mark.unit
+    def test_escaped_quotes(self):
+        """An escaped quote doesn't end the string"""
+        assert self.feed_all(['{"text": "say \\"}\\" ok"', "}"]) == [False, True]
+
+    @pytest.mark.unit
+    def test_escape_split_across_pieces(self):
+        """A backslash at the end of one piece escapes the next character"""
+        assert self.feed_all(['{"text": "a\\', '"}', '"}']) == [False, False, True]
+
+    @pytest.mark.unit
+    def test_quotes_in_prose_before_object(self):
+        """Quotes before the object don't start a string"""
+        assert self.feed_all(['He said "hi', '" {"a": 1}']) == [False, True]
@@ -0,0 +1,294 @@
+"""
+OTA Deployment Tests - quick deploy and remote marker handling (fake SSH)
+"""
+
+import pytest
+import sys
+import os
+import shlex
+import shutil
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from deployment.ota_manager import OTADeploymentManager, DeploymentConfig, _TREE_HASH_FILE
+
+
+# Path with a space and shell metacharacters
+AWKWARD_REMOTE_DIR = "/home/brutally/brutally honest;touch pwned"
+
+
+class FakeRemote:
+    """Stands in for _run_ssh_command, recording every remote command"""
+
+    def __init__(self, tree_hash: str = ""):
+        self.tree_hash = tree_hash
+        self.commands = []
+
+    async def run(self, command, timeout=60, input_data=None):
+        self.commands.append(command)
+        if _TREE_HASH_FILE in command and "cat " in command:
+            return True, self.tree_hash, ""
+        if command.startswith("systemctl is-active"):
+            return True, "active\nactive\n", ""
+        return True, "", ""
+
+    def marker_commands(self):
+        return [c for c in self.commands if c.startswith("touch ")]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """Manager whose SSH, rsync and tree hash are faked"""
+    manager = OTADeploymentManager(DeploymentConfig(remote_dir=AWKWARD_REMOTE_DIR))
+    remote = FakeRemote()
+    manager.remote = remote
+    monkeypatch.setattr(manager, "_run_ssh_command", remote.run)
+
+    async def tree_hash():
+        return "abc123"
+
+    async def rsync(dry_run=False, entries=None, multiplex=True, changed=None):
+        if changed is not None:
+            changed.extend(["src/app.py", "src/util.py"])
+        return True, 2, ""
+
+    async def bulk_upload(files):
+        return True, len(files), ""
+
+    async def verify(files):
+        return []
+
+    monkeypatch.setattr(manager, "_compute_tree_hash", tree_hash)
+    monkeypatch.setattr(manager, "_run_rsync", rsync)
+    monkeypatch.setattr(manager, "_bulk_upload", bulk_upload)
+    monkeypatch.setattr(manager, "_verify_remote_hashes", verify)
+    return manager
+
+
+# ============================================
+# QUICK DEPLOY TREE HASH TESTS
+# ============================================
+
+class TestQuickDeployTreeHash:
+    """Tests for recording and short-circuiting on the deployed tree hash"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_clean_sync_records_tree_hash(self, manager):
+        """A verified deploy stores the tree hash"""
+        result = await manager.deploy_quick()
+
+        assert result.success
+        [marker] = manager.remote.marker_commands()
+        assert "echo abc123 >" in marker
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_unchanged_tree_short_circuits(self, manager, monkeypatch):
+        """A matching remote hash skips the sync"""
+        manager.remote.tree_hash = "abc123\n"
+
+        async def rsync(**kwargs):
+            raise AssertionError("rsync should not run")
+
+        monkeypatch.setattr(manager, "_run_rsync", rsync)
+        result = await manager.deploy_quick()
+
+        assert result.success
+        assert result.files_synced == 0
+        assert manager.remote.marker_commands() == []
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_mismatched_files_resent_and_rechecked(self, manager, monkeypatch):
+        """Only the mismatched files are re-uploaded; a clean re-check keeps the hash"""
+        checks = iter([["src/app.py"], []])
+        checked, uploaded = [], []
+
+        async def verify(files):
+            checked.append(list(files))
+            return next(checks)
+
+        async def bulk_upload(files):
+            uploaded.append(list(files))
+            return True, len(files), ""
+
+        monkeypatch.setattr(manager, "_verify_remote_hashes", verify)
+        monkeypatch.setattr(manager, "_bulk_upload", bulk_upload)
+        result = await manager.deploy_quick()
+
+        assert checked == [["src/app.py", "src/util.py"], ["src/app.py"]]
+        assert uploaded == [["src/app.py"]]
+        assert result.warnings == []
+        [marker] = manager.remote.marker_commands()
+        assert "echo abc123 >" in marker
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_remaining_mismatch_clears_tree_hash(self, manager, monkeypatch):
+        """Files still wrong after the re-upload clear the hash"""
+        async def verify(files):
+            return ["src/app.py"]
+
+        monkeypatch.setattr(manager, "_verify_remote_hashes", verify)
+        result = await manager.deploy_quick()
+
+        assert any("Hash mismatch" in w for w in result.warnings)
+        [marker] = manager.remote.marker_commands()
+        assert "abc123" not in marker
+        assert f"rm -f {shlex.quote(AWKWARD_REMOTE_DIR)}/{_TREE_HASH_FILE}" in marker
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_failed_reupload_clears_tree_hash(self, manager, monkeypatch):
+        """A failed re-upload clears the hash"""
+        checks = iter([["src/app.py"], []])
+
+        async def verify(files):
+            return next(checks)
+
+        async def bulk_upload(files):
+            return False, 0, "connection reset"
+
+        monkeypatch.setattr(manager, "_verify_remote_hashes", verify)
+        monkeypatch.setattr(manager, "_bulk_upload", bulk_upload)
+        result = await manager.deploy_quick()
+
+        assert any("Re-upload" in w for w in result.warnings)
+        [marker] = manager.remote.marker_commands()
+        assert "abc123" not in marker
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_remote_dir_quoted(self, manager):
+        """remote_dir stays one shell word in the marker commands"""
+        await manager.deploy_quick()
+
+        hash_read = next(c for c in manager.remote.commands if "cat " in c)
+        assert f"{AWKWARD_REMOTE_DIR}/{_TREE_HASH_FILE}" in shlex.split(hash_read)
+        [marker] = manager.remote.marker_commands()
+        words = shlex.split(marker)
+        assert f"{AWKWARD_REMOTE_DIR}/.last_deployment" in words
+        assert f"{AWKWARD_REMOTE_DIR}/{_TREE_HASH_FILE}" in words
+
+
+# ============================================
+# SYNC STRATEGY TESTS
+# ============================================
+
+class TestSyncFiles:
+    """Tests for choosing between first-time and incremental sync"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_deployed_remote_uses_single_rsync(self, manager, monkeypatch):
+        """An existing deployment syncs incrementally"""
+        async def probe(command, timeout=60, input_data=None):
+            manager.remote.commands.append(command)
+            return True, "deployed\nzstd\n", ""
+
+        monkeypatch.setattr(manager, "_run_ssh_command", probe)
+        assert await manager._sync_files() == (True, 2, "")
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_remote_dir_quoted(self, manager):
+        """remote_dir stays one shell word in the deployment probe"""
+        async def parallel():
+            return True, 0, ""
+
+        manager._run_rsync_parallel = parallel
+        await manager._sync_files()
+
+        [probe] = manager.remote.commands
+        assert f"{AWKWARD_REMOTE_DIR}/.last_deployment" in shlex.split(probe)
+
+
+# ============================================
+# DEPENDENCY MARKER TESTS
+# ============================================
+
+class TestChangedDependencies:
+    """Tests for comparing dependency manifests with the remote install markers"""
+
+    @pytest.fixture
+    def requirements(self, manager, tmp_path):
+        manager.local_dir = tmp_path
+        path = tmp_path / "requirements.txt"
+        path.write_text("fastapi\n")
+        return OTADeploymentManager._hash_file(path)
+
+    def _remote_markers(self, manager, monkeypatch, output):
+        async def run(command, timeout=60, input_data=None):
+            manager.remote.commands.append(command)
+            return True, output, ""
+
+        monkeypatch.setattr(manager, "_run_ssh_command", run)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_matching_marker_skips_install(self, manager, monkeypatch, requirements):
+        """An unchanged manifest needs no install"""
+        self._remote_markers(manager, monkeypatch, f".requirements.sha256 {requirements}\n")
+        assert await manager._get_changed_dependencies() == {}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_missing_marker_triggers_install(self, manager, monkeypatch, requirements):
+        """A manifest without a remote marker is reinstalled"""
+        self._remote_markers(manager, monkeypatch, ".requirements.sha256 \n")
+        assert await manager._get_changed_dependencies() == {"requirements.txt": requirements}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_remote_dir_quoted(self, manager, monkeypatch, requirements):
+        """remote_dir stays one shell word in the marker read"""
+        self._remote_markers(manager, monkeypatch, "")
+        await manager._get_changed_dependencies()
+
+        [command] = manager.remote.commands
+        assert shlex.split(command)[:2] == ["cd", AWKWARD_REMOTE_DIR]
+
+
+# ============================================
+# BULK UPLOAD TESTS
+# ============================================
+
+@pytest.fixture
+def local_ssh(tmp_path, monkeypatch):
+    """An 'ssh' on PATH that runs the remote command locally"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ssh = bin_dir / "ssh"
+    ssh.write_text('#!/bin/sh\nfor last; do :; done\nexec sh -c "$last"\n')
+    ssh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path
+
+
+class TestBulkUpload:
+    """Tests for the tar-over-SSH upload of selected files"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(shutil.which("tar") is None, reason="tar not installed")
+    async def test_selected_files_streamed(self, local_ssh, monkeypatch):
+        """Only the listed files arrive, at their relative paths"""
+        import deployment.ota_manager as ota
+        monkeypatch.setattr(ota, "ASYNCSSH_AVAILABLE", False)
+        source = local_ssh / "src tree"
+        (source / "src").mkdir(parents=True)
+        (source / "src" / "app.py").write_text("print('new')\n")
+        (source / "src" / "skip.py").write_text("print('skip')\n")
+        target = local_ssh / "remote dir"
+        manager = OTADeploymentManager(DeploymentConfig(remote_dir=str(target), ssh_multiplexing=False))
+        manager.local_dir = source
+
+        success, count, message = await manager._bulk_upload(["src/app.py"])
+
+        assert success, message
+        assert count == 1
+        assert (target / "src" / "app.py").read_text() == "print('new')\n"
+        assert not (target / "src" / "skip.py").exists()
@@ -0,0 +1,244 @@
+"""
+Vector Store Tests - LOCAL mode (SQLite chunk store with FTS5 keyword search)
+"""
+
+import pytest
+import sys
+import json
+import os
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+pytest.importorskip("numpy")
+
+
+def make_doc(doc_id: str, content: str):
+    """DocumentInfo for a small text document."""
+    from documents.processor import DocumentInfo
+    return DocumentInfo(
+        id=doc_id,
+        filename=f"{doc_id}.txt",
+        file_type=".txt",
+        content=content,
+        metadata={},
+        upload_time=datetime.now(),
+        file_size=len(content),
+        text_length=len(content),
+        hash=doc_id
+    )
+
+
+@pytest.fixture
+def local_store_factory(tmp_path, monkeypatch):
+    """Build LOCAL-mode vector stores over one temp data directory."""
+    monkeypatch.setenv("BH_VECTOR_STORE_MODE", "local")
+    monkeypatch.delenv("BH_LOCAL_EMBEDDINGS", raising=False)
+    from documents.vector_store import VectorStore
+
+    async def factory():
+        store = VectorStore(data_dir=str(tmp_path))
+        assert await store.initialize()
+        return store
+
+    return factory
+
+
+# ============================================
+# LEGACY MIGRATION TESTS
+# ============================================
+
+class TestLegacyMigration:
+    """Tests for importing pre-SQLite JSON chunk files."""
+
+    def _write_legacy_files(self, data_dir: Path):
+        (data_dir / "documents_registry.json").write_text(json.dumps({
+            "legacy": {"id": "legacy", "filename": "legacy.txt", "chunk_count": 2}
+        }))
+        chunks_dir = data_dir / "documents_chunks"
+        chunks_dir.mkdir()
+        (chunks_dir / "legacy.json").write_text(json.dumps([
+            {
+                "chunk_id": "legacy:chunk:0",
+                "content": "Quarterly revenue grew in the northern region",
+                "metadata": {"document_id": "legacy", "chunk_index": 0}
+            },
+            {
+                "chunk_id": "legacy:chunk:1",
+                "content": "Headcount stayed flat",
+                "metadata": {"document_id": "legacy", "chunk_index": 1}
+            },
+        ]))
+        (data_dir / "inverted_index.json").write_text(json.dumps({"revenue": ["legacy"]}))
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_json_chunks_imported_and_searchable(self, tmp_path, local_store_factory):
+        """Legacy chunk files are imported and found by keyword search."""
+        self._write_legacy_files(tmp_path)
+        store = await local_store_factory()
+
+        results = await store.search_documents("revenue northern", limit=5)
+
+        assert [r.chunk_id for r in results] == ["legacy:chunk:0"]
+        assert results[0].document_id == "legacy"
+        assert results[0].score == pytest.approx(1.0)
+        chunks = await store.get_document_chunks("legacy")
+        assert [c.content for c in chunks] == [
+            "Quarterly revenue grew in the northern region",
+            "Headcount stayed flat",
+        ]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_legacy_files_renamed_not_deleted(self, tmp_path, local_store_factory):
+        """Migrated files are kept as *.migrated and not imported twice."""
+        self._write_legacy_files(tmp_path)
+        await local_store_factory()
+
+        chunks_dir = tmp_path / "documents_chunks"
+        assert not (chunks_dir / "legacy.json").exists()
+        assert (chunks_dir / "legacy.json.migrated").exists()
+        assert not (tmp_path / "inverted_index.json").exists()
+        assert (tmp_path / "inverted_index.json.migrated").exists()
+
+        # A restart finds nothing left to migrate and keeps the imported chunks
+        store = await local_store_factory()
+        assert len(await store.get_document_chunks("legacy")) == 2
+
+
+# ============================================
+# STORE / SEARCH / DELETE TESTS
+# ============================================
+
+class TestLocalStore:
+    """Tests for storing, searching and deleting documents locally."""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_search_ranks_by_query_token_overlap(self, local_store_factory):
+        """Chunks matching more query words score higher."""
+        store = await local_store_factory()
+        assert await store.store_document(make_doc("a", "apple pie recipe"))
+        assert await store.store_document(make_doc("b", "apple orchard"))
+
+        results = await store.search_documents("apple pie", limit=5)
+
+        assert [r.document_id for r in results] == ["a", "b"]
+        assert results[0].score == pytest.approx(1.0)
+        assert results[1].score == pytest.approx(0.5)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_accented_queries_match(self, local_store_factory):
+        """Words with diacritics are found through the keyword index"""
+        store = await local_store_factory()
+        await store.store_document(make_doc("nl", "De coördinatie van het café privé overleg"))
+
+        for query in ("coördinatie", "café privé"):
+            results = await store.search_documents(query, limit=5)
+            assert [r.document_id for r in results] == ["nl"], query
+            assert results[0].score == pytest.approx(1.0)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_content_fts_index_rebuilt(self, tmp_path, local_store_factory):
+        """An index over raw content from an earlier version is rebuilt from tokens"""
+        import sqlite3
+        store = await local_store_factory()
+        await store.store_document(make_doc("nl", "De coördinatie van het overleg"))
+        await store.flush()
+        store._db.close()
+
+        db = sqlite3.connect(str(tmp_path / "local_store.sqlite"))
+        db.execute("DROP TABLE chunks_fts")
+        db.execute(
+            "CREATE VIRTUAL TABLE chunks_fts USING fts5("
+            "content, doc_id UNINDEXED, idx UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+        )
+        db.execute("INSERT INTO chunks_fts (content, doc_id, idx) SELECT content, doc_id, idx FROM chunks")
+        db.execute("UPDATE chunks SET tokens = NULL")
+        db.commit()
+        db.close()
+
+        reopened = await local_store_factory()
+
+        results = await reopened.search_documents("coördinatie", limit=5)
+        assert [r.document_id for r in results] == ["nl"]
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_delete_removes_chunks_and_registry_entry(self, local_store_factory):
+        """Deleted documents disappear from search, chunks and the registry."""
+        store = await local_store_factory()
+        await store.store_document(make_doc("a", "apple pie recipe"))
+        await store.store_document(make_doc("b", "apple orchard"))
+
+        assert await store.delete_document("a")
+
+        results = await store.search_documents("apple pie", limit=5)
+        assert [r.document_id for r in results] == ["b"]
+        assert await store.get_document_chunks("a") == []
+        assert "a" not in {d["id"] for d in store.list_documents()}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_documents_survive_restart(self, local_store_factory):
+        """Chunks and registry entries are persisted across instances."""
+        store = await local_store_factory()
+        await store.store_document(make_doc("a", "apple pie recipe"))
+        await store.flush()
+
+        reopened = await local_store_factory()
+
+        results = await reopened.search_documents("recipe", limit=5)
+        assert [r.document_id for r in results] == ["a"]
+        assert "a" in {d["id"] for d in reopened.list_documents()}
+
+
+# ============================================
+# REGISTRY FLUSH TESTS
+# ============================================
+
+class TestRegistryFlush:
+    """Tests for coalesced document registry writes."""
+
+    @staticmethod
+    def _registry_on_disk(store) -> dict:
+        with open(store.documents_file) as f:
+            return json.load(f)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_writes_coalesced_within_interval(self, local_store_factory):
+        """Saves within the interval are batched into one delayed write."""
+        store = await local_store_factory()
+        store.REGISTRY_FLUSH_INTERVAL = 0.2
+
+        await store.store_document(make_doc("d0", "first document"))
+        assert set(self._registry_on_disk(store)) == {"d0"}
+
+        for i in range(1, 4):
+            await store.store_document(make_doc(f"d{i}", f"document number {i}"))
+        assert set(self._registry_on_disk(store)) == {"d0"}
+
+        await asyncio.sleep(0.4)
+        assert set(self._registry_on_disk(store)) == {"d0", "d1", "d2", "d3"}
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_changes(self, local_store_factory):
+        """flush() writes pending changes immediately."""
+        store = await local_store_factory()
+        store.REGISTRY_FLUSH_INTERVAL = 60.0
+
+        await store.store_document(make_doc("d0", "first document"))
+        await store.store_document(make_doc("d1", "second document"))
+        assert "d1" not in self._registry_on_disk(store)
+
+        await store.flush()
+        assert set(self._registry_on_disk(store)) == {"d0", "d1"}
+        assert not os.path.exists(f"{store.documents_file}.tmp")
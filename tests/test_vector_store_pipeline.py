@@ -0,0 +1,93 @@
+"""
+Vector Store Tests - embed/upload pipeline (QDRANT mode with a fake client)
+"""
+
+import pytest
+import sys
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+pytest.importorskip("numpy")
+
+
+class FakeQdrantClient:
+    """Records upserts; optionally fails after the producer has filled the queue"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.upserted = []
+
+    async def upsert(self, collection_name, points):
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("qdrant unavailable")
+        self.upserted.extend(points)
+
+
+@pytest.fixture
+def qdrant_store(tmp_path, monkeypatch):
+    """VectorStore in QDRANT mode with stubbed embeddings and points"""
+    monkeypatch.setenv("BH_VECTOR_STORE_MODE", "qdrant")
+    from documents.vector_store import VectorStore
+
+    store = VectorStore(data_dir=str(tmp_path))
+    store.is_initialized = True
+    store.embedding_model = object()
+    monkeypatch.setattr(store, "_generate_embeddings", lambda texts: [[0.0]] * len(texts))
+    monkeypatch.setattr(store, "_build_points", lambda batch, embeddings: list(batch))
+    return store
+
+
+def chunks(count: int):
+    return [f"chunk {i}" for i in range(count)]
+
+
+# ============================================
+# PIPELINE TESTS
+# ============================================
+
+class TestEmbedAndUpsert:
+    """Tests for the overlapped embed/upload pipeline"""
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_all_batches_uploaded(self, qdrant_store):
+        """Every chunk reaches the client"""
+        qdrant_store.client = FakeQdrantClient()
+        count = 3 * qdrant_store.PIPELINE_BATCH_SIZE
+
+        stored = await asyncio.wait_for(qdrant_store._embed_and_upsert([("doc", chunks(count))]), 5)
+
+        assert stored == count
+        assert sorted(i for _, i, _ in qdrant_store.client.upserted) == list(range(count))
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_failing_upsert_raises_instead_of_hanging(self, qdrant_store):
+        """A worker that dies with a full queue doesn't block the sentinel"""
+        qdrant_store.client = FakeQdrantClient(fail=True)
+        count = 3 * qdrant_store.PIPELINE_BATCH_SIZE
+
+        with pytest.raises(RuntimeError, match="qdrant unavailable"):
+            await asyncio.wait_for(qdrant_store._embed_and_upsert([("doc", chunks(count))]), 5)
+
+    @pytest.mark.unit
+    @pytest.mark.asyncio
+    async def test_store_document_returns_false_on_upsert_error(self, qdrant_store, monkeypatch):
+        """store_document reports the failure and records nothing"""
+        from documents.processor import DocumentInfo
+        qdrant_store.client = FakeQdrantClient(fail=True)
+        monkeypatch.setattr(
+            qdrant_store, "_chunk_text", lambda text: chunks(3 * qdrant_store.PIPELINE_BATCH_SIZE)
+        )
+        doc = DocumentInfo(
+            id="doc", filename="doc.txt", file_type=".txt", content="text", metadata={},
+            upload_time=datetime.now(), file_size=4, text_length=4, hash="doc"
+        )
+
+        assert await asyncio.wait_for(qdrant_store.store_document(doc), 5) is False
+        assert "doc" not in qdrant_store.documents